@@ -0,0 +1,4 @@
+''' Benchmarks for twitter_user_evaluation. Run them from the repository root,
+with the same environment as the app, e.g.:
+    python -m benchmarks.bench_retrieval
+'''
@@ -0,0 +1,89 @@
+''' Compares computing the counting charts with one pass over the tweets per
+chart against the fused single pass of analytics.TweetAggregates.
+
+The bundled test timelines are repeated to each size. The named entity stage
+needs the nltk data and is skipped when it is missing.
+    python -m benchmarks.bench_aggregates
+'''
+import os
+import pickle
+import time
+
+from twitter_user_evaluation.tools.analytics import INTERVALS, \
+    TweetAggregates, all_ne_occurences, related_hashtags, related_users, \
+    volume_by_interval
+
+
+DATA_DIR = os.path.join('tests', 'test_data')
+SIZES = [400, 3200, 51200]
+ENTITY_SIZES = [400, 3200]
+REPEATS = 3
+
+
+def load_tweets():
+    ''' Returns every tweet of the bundled test timelines.
+    '''
+    tweets = []
+    for data_file in sorted(os.listdir(DATA_DIR)):
+        with open(os.path.join(DATA_DIR, data_file), 'rb') as f:
+            tweets.extend(pickle.load(f))
+    return tweets
+
+
+def separate(tweets, entities):
+    ''' Builds the charts with one traversal per chart.
+    '''
+    related_hashtags(tweets)
+    related_users(tweets)
+    volume_by_interval(tweets, INTERVALS)
+    if entities:
+        all_ne_occurences(tweets)
+
+
+def fused(tweets, entities):
+    ''' Builds the charts from one TweetAggregates traversal.
+    '''
+    stages = ['hashtags', 'users', 'volume'] + (['entities'] if entities
+                                                else [])
+    aggregates = TweetAggregates(tweets, stages)
+    aggregates.related_hashtags()
+    aggregates.related_users()
+    aggregates.volume_by_interval(INTERVALS)
+    if entities:
+        aggregates.all_ne_occurences()
+
+
+def best_of(func, *args):
+    ''' Returns the best wall time of REPEATS runs of func.
+    '''
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    tweets = load_tweets()
+    try:
+        all_ne_occurences(tweets[:1])
+        entity_sizes = ENTITY_SIZES
+    except LookupError:
+        print('nltk data missing, skipping the named entity stage')
+        entity_sizes = []
+    print('{:<10}{:>8}{:>14}{:>12}{:>10}'.format(
+        'stages', 'tweets', 'separate ms', 'fused ms', 'speedup'))
+    runs = [('counting', size, False) for size in SIZES]
+    runs += [('all', size, True) for size in entity_sizes]
+    for name, size, entities in runs:
+        batch = (tweets * (size // len(tweets) + 1))[:size]
+        separate_time = best_of(separate, batch, entities)
+        fused_time = best_of(fused, batch, entities)
+        print('{:<10}{:>8}{:>14.2f}{:>12.2f}{:>9.2f}x'.format(
+            name, size, 1000 * separate_time, 1000 * fused_time,
+            separate_time / fused_time))
+
+
+if __name__ == '__main__':
+    main()
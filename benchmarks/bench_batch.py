@@ -0,0 +1,65 @@
+''' Compares a list of retrieval.Tweet with the columnar retrieval.TweetBatch
+on synthetic timelines: the memory each takes and the time the counting
+charts of analytics.TweetAggregates take over it.
+    python -m benchmarks.bench_batch
+'''
+import time
+import tracemalloc
+
+from twitter_user_evaluation.tools.analytics import INTERVALS, \
+    TweetAggregates
+from twitter_user_evaluation.tools.retrieval import TweetBatch, clean_tweet
+
+from .synthetic import make_timeline
+
+
+SIZES = [200, 3200, 51200]
+REPEATS = 3
+
+
+def allocated(build, statuses):
+    ''' Returns what build(statuses) returns and the bytes it still holds.
+    '''
+    tracemalloc.start()
+    result = build(statuses)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def charts(tweets):
+    ''' Builds the counting charts of tweets.
+    '''
+    aggregates = TweetAggregates(tweets, ['hashtags', 'users', 'volume'])
+    aggregates.related_hashtags()
+    aggregates.related_users()
+    aggregates.volume_by_interval(INTERVALS)
+
+
+def best_of(func, *args):
+    ''' Returns the best wall time of REPEATS runs of func.
+    '''
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    print('{:>8}{:>14}{:>14}{:>12}{:>12}'.format(
+        'tweets', 'list B/tweet', 'batch B/tweet', 'list ms', 'batch ms'))
+    for size in SIZES:
+        statuses = make_timeline(size)
+        tweets, list_bytes = allocated(
+            lambda statuses: [clean_tweet(status) for status in statuses],
+            statuses)
+        batch, batch_bytes = allocated(TweetBatch.from_statuses, statuses)
+        print('{:>8}{:>14.0f}{:>14.0f}{:>12.2f}{:>12.2f}'.format(
+            size, list_bytes / size, batch_bytes / size,
+            1000 * best_of(charts, tweets), 1000 * best_of(charts, batch)))
+
+
+if __name__ == '__main__':
+    main()
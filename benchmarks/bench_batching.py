@@ -0,0 +1,58 @@
+''' Compares the throughput of concurrent clients that each call predict on
+their own, serialized by a lock as a non thread safe model must be, with
+clients sharing predict calls through a BatchingPredictor.
+    python -m benchmarks.bench_batching
+'''
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+from twitter_user_evaluation.tools.analytics import predict_sequences
+from twitter_user_evaluation.tools.inference import BatchingPredictor
+
+from .bench_inference import build_model, load_sequences
+
+
+CLIENTS = [1, 4, 16, 64]
+REQUESTS_PER_CLIENT = 4
+TWEETS_PER_REQUEST = 200
+
+
+def run_clients(predict, clients, timeline):
+    ''' Runs clients threads that each call predict REQUESTS_PER_CLIENT
+    times and returns the requests served per second.
+    '''
+    def client(_):
+        for _ in range(REQUESTS_PER_CLIENT):
+            predict(timeline)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(client, range(clients)))
+    return clients * REQUESTS_PER_CLIENT / (time.perf_counter() - start)
+
+
+def main():
+    model = build_model()
+    timeline = load_sequences()[:TWEETS_PER_REQUEST]
+    predict_sequences(model, timeline)
+    lock = threading.Lock()
+
+    def locked_predict(sequences):
+        with lock:
+            return predict_sequences(model, sequences)
+
+    batching = BatchingPredictor(
+        lambda sequences: predict_sequences(model, sequences))
+    print('{:>8}{:>14}{:>14}{:>10}'.format(
+        'clients', 'direct req/s', 'batched req/s', 'speedup'))
+    for clients in CLIENTS:
+        direct = run_clients(locked_predict, clients, timeline)
+        batched = run_clients(batching.predict, clients, timeline)
+        print('{:>8}{:>14.1f}{:>14.1f}{:>9.1f}x'.format(
+            clients, direct, batched, batched / direct))
+    print(batching.stats())
+
+
+if __name__ == '__main__':
+    main()
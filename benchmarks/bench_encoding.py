@@ -0,0 +1,88 @@
+''' Compares the size of an analysis response, and the time to serialize it,
+as the flask.jsonify json sent so far against the compact tweet table of
+analytics.compact_analysis, MessagePack, and gzip or brotli compression.
+
+The analyses are of the bundled test timelines and of a synthetic timeline
+of 3200 tweets. MessagePack and brotli are skipped when not installed.
+    python -m benchmarks.bench_encoding
+'''
+import os
+import pickle
+import time
+
+from twitter_user_evaluation.app import app
+from twitter_user_evaluation.tools.analytics import analyze_tweets, \
+    compact_analysis
+from twitter_user_evaluation.tools.encoding import JSON_MIMETYPE, \
+    MSGPACK_MIMETYPE, compress, content_encodings, mimetypes, serialize
+from twitter_user_evaluation.tools.retrieval import TweetBatch
+
+from .fake_twitter import DATA_DIR
+from .synthetic import make_timeline
+
+
+SYNTHETIC_SIZE = 3200
+REPEATS = 5
+
+
+def best_of(func, *args):
+    ''' Returns what func returns and the best wall time of REPEATS runs.
+    '''
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - start)
+    return result, min(timings)
+
+
+def jsonified(analysis):
+    ''' Returns the body flask.jsonify makes of analysis.
+    '''
+    from flask import jsonify
+    return jsonify(analysis).get_data()
+
+
+def timelines():
+    ''' Returns the bundled test timelines and a synthetic one, by name.
+    '''
+    timelines = {}
+    for data_file in sorted(os.listdir(DATA_DIR)):
+        with open(os.path.join(DATA_DIR, data_file), 'rb') as f:
+            timelines[data_file.split('_')[0]] = TweetBatch.from_tweets(
+                pickle.load(f))
+    timelines['synthetic{}'.format(SYNTHETIC_SIZE)] = \
+        TweetBatch.from_statuses(make_timeline(SYNTHETIC_SIZE))
+    return timelines
+
+
+def main():
+    print('{:<18}{:<22}{:>10}{:>8}{:>12}'.format(
+        'timeline', 'encoding', 'bytes', 'ratio', 'ms'))
+    for name, tweets in timelines().items():
+        analysis = analyze_tweets(tweets)
+        with app.app_context():
+            baseline, baseline_time = best_of(jsonified, analysis)
+        rows = [('jsonify', baseline, baseline_time)]
+        for compact in [False, True]:
+            payload = compact_analysis(analysis, tweets) \
+                if compact else analysis
+            for mimetype in mimetypes():
+                body, serialize_time = best_of(serialize, payload, mimetype)
+                label = '{}{}'.format('compact ' if compact else '',
+                                      {JSON_MIMETYPE: 'json',
+                                       MSGPACK_MIMETYPE: 'msgpack'}[mimetype])
+                rows.append((label, body, serialize_time))
+                for encoding in content_encodings():
+                    compressed, compress_time = best_of(compress, body,
+                                                        encoding)
+                    rows.append(('{} {}'.format(label, encoding), compressed,
+                                 serialize_time + compress_time))
+        for label, body, seconds in rows:
+            print('{:<18}{:<22}{:>10}{:>8.2f}{:>12.2f}'.format(
+                name, label, len(body), len(body) / len(baseline),
+                1000 * seconds))
+
+
+if __name__ == '__main__':
+    main()
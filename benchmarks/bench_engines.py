@@ -0,0 +1,80 @@
+''' Compares the political sentiment engines registered in analytics.
+
+Latency is measured on the bundled test timelines. When the prepared data
+written by political_sentiment_models/preprocess_data.py is present, the
+engines are also scored on the same held out split the training scripts use,
+as democrat versus republican accuracy on its partisan tweets.
+    python -m benchmarks.bench_engines
+'''
+import os
+import pickle
+import time
+
+import numpy as np
+
+from twitter_user_evaluation.tools.analytics import DEMOCRAT, NEUTRAL, \
+    POLITICAL_ENGINES, political_predictions
+from twitter_user_evaluation.tools.retrieval import Tweet
+
+
+DATA_DIR = os.path.join('tests', 'test_data')
+PREPARED_DATA_DIR = os.path.join('political_sentiment_models', 'prepared_data')
+VALIDATION_SPLIT = 0.2
+REPEATS = 5
+
+
+def load_timelines():
+    ''' Returns every tweet of the bundled test timelines.
+    '''
+    tweets = []
+    for data_file in sorted(os.listdir(DATA_DIR)):
+        with open(os.path.join(DATA_DIR, data_file), 'rb') as f:
+            tweets.extend(pickle.load(f))
+    return tweets
+
+
+def load_validation():
+    ''' Returns the partisan tweets of the held out split and whether each is
+    democrat, or None when the prepared data is missing.
+    '''
+    texts_path = os.path.join(PREPARED_DATA_DIR, 'texts.pickle')
+    labels_path = os.path.join(PREPARED_DATA_DIR, 'labels.pickle')
+    if not (os.path.exists(texts_path) and os.path.exists(labels_path)):
+        return None
+    import pandas as pd
+    texts = list(pd.read_pickle(texts_path))
+    labels = list(pd.read_pickle(labels_path))
+    split = -int(VALIDATION_SPLIT * len(texts))
+    tweets, democrat = [], []
+    for text, label in zip(texts[split:], labels[split:]):
+        if label != NEUTRAL:
+            tweets.append(Tweet(tweet_id='0', screen_name='', time=0,
+                                raw_text=text, cleaned_text=text,
+                                hashtag_mentions=[], user_mentions=[],
+                                retweets=0, favorites=0))
+            democrat.append(label == DEMOCRAT)
+    return tweets, np.array(democrat)
+
+
+def main():
+    tweets = load_timelines()
+    validation = load_validation()
+    print('{:<8}{:>14}{:>12}'.format('engine', 'ms/timeline', 'accuracy'))
+    for engine in sorted(POLITICAL_ENGINES):
+        political_predictions(tweets[:1], engine)
+        timings = []
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            political_predictions(tweets, engine)
+            timings.append(time.perf_counter() - start)
+        per_timeline = 1000 * min(timings) * 200 / len(tweets)
+        accuracy = float('nan')
+        if validation is not None:
+            preds = political_predictions(validation[0], engine)
+            accuracy = np.mean((preds[:, 1] > 0.5) == validation[1])
+        print('{:<8}{:>14.2f}{:>12.3f}'.format(engine, per_timeline,
+                                               accuracy))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+''' Compares political sentiment inference with every sequence padded to
+MAX_SEQUENCE_LENGTH against length bucketed inference.
+
+The model is the conv_gmp architecture from political_sentiment_models built
+with a variable input length and random weights, so only keras is needed.
+The sequences come from the bundled test timelines, repeated to size.
+    python -m benchmarks.bench_inference
+'''
+import os
+import pickle
+import time
+
+from keras.layers import Conv1D, Dense, Embedding, GlobalMaxPooling1D, \
+    Input, MaxPooling1D
+from keras.models import Model
+from keras.preprocessing.sequence import pad_sequences
+import numpy as np
+
+from twitter_user_evaluation.tools.analytics import predict_sequences
+from twitter_user_evaluation.tools.resources import MAX_SEQUENCE_LENGTH, \
+    RESOURCES
+
+
+DATA_DIR = os.path.join('tests', 'test_data')
+SIZES = [200, 3200]
+REPEATS = 3
+
+
+def build_model():
+    ''' Builds the conv_gmp architecture without a fixed input length.
+    '''
+    sequence_input = Input(shape=(None,), dtype='int32')
+    x = Embedding(20000, 100)(sequence_input)
+    x = Conv1D(128, 5, activation='relu')(x)
+    x = MaxPooling1D(5)(x)
+    x = Conv1D(128, 5, activation='relu')(x)
+    x = MaxPooling1D(5)(x)
+    x = Conv1D(128, 5, activation='relu')(x)
+    x = GlobalMaxPooling1D()(x)
+    x = Dense(128, activation='relu')(x)
+    return Model(sequence_input, Dense(2, activation='softmax')(x))
+
+
+def load_sequences():
+    ''' Tokenizes the raw text of every bundled test tweet.
+    '''
+    texts = []
+    for data_file in sorted(os.listdir(DATA_DIR)):
+        with open(os.path.join(DATA_DIR, data_file), 'rb') as f:
+            texts.extend(tweet.raw_text for tweet in pickle.load(f))
+    return RESOURCES.pol_model_tknzr.texts_to_sequences(texts)
+
+
+def best_of(func):
+    ''' Returns the result and the best wall time of REPEATS runs of func.
+    '''
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return result, min(timings)
+
+
+def main():
+    model = build_model()
+    sequences = load_sequences()
+    lengths = [len(sequence) for sequence in sequences]
+    print('tokens per tweet: mean {:.1f}, max {}'.format(
+        np.mean(lengths), max(lengths)))
+    print('{:>8}{:>12}{:>12}{:>10}{:>14}{:>14}'.format(
+        'tweets', 'fixed s', 'bucketed s', 'speedup', 'max abs diff',
+        'same argmax'))
+    for size in SIZES:
+        batch = (sequences * (size // len(sequences) + 1))[:size]
+        fixed, fixed_time = best_of(lambda: model.predict(
+            pad_sequences(batch, maxlen=MAX_SEQUENCE_LENGTH)))
+        bucketed, bucketed_time = best_of(
+            lambda: predict_sequences(model, batch))
+        print('{:>8}{:>12.3f}{:>12.3f}{:>9.1f}x{:>14.2e}{:>13.1f}%'.format(
+            size, fixed_time, bucketed_time, fixed_time / bucketed_time,
+            np.abs(fixed - bucketed).max(),
+            100 * np.mean(fixed.argmax(1) == bucketed.argmax(1))))
+
+
+if __name__ == '__main__':
+    main()
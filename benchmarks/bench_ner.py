@@ -0,0 +1,54 @@
+''' Compares named entity extraction one tweet at a time with nltk's
+ne_chunk(pos_tag(word_tokenize(text))), as analytics used to do it, against
+the batched entities.parse_ne_chunks, on the bundled test timelines.
+    python -m benchmarks.bench_ner
+'''
+import os
+import pickle
+import time
+
+from nltk import ne_chunk, pos_tag, word_tokenize
+
+from twitter_user_evaluation.tools.entities import continuous_chunks, \
+    parse_ne_chunks
+
+
+DATA_DIR = os.path.join('tests', 'test_data')
+REPEATS = 3
+
+
+def per_text(texts):
+    ''' Tokenizes, tags and chunks every text with its own nltk calls.
+    '''
+    return [continuous_chunks(ne_chunk(pos_tag(word_tokenize(text))))
+            for text in texts]
+
+
+def best_of(func, texts):
+    ''' Returns the result and the best wall time of REPEATS runs.
+    '''
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = func(texts)
+        timings.append(time.perf_counter() - start)
+    return result, min(timings)
+
+
+def main():
+    print('{:<18}{:>8}{:>12}{:>12}{:>10}'.format(
+        'timeline', 'tweets', 'per text s', 'batched s', 'speedup'))
+    for data_file in sorted(os.listdir(DATA_DIR)):
+        with open(os.path.join(DATA_DIR, data_file), 'rb') as f:
+            texts = [tweet.cleaned_text for tweet in pickle.load(f)]
+        parse_ne_chunks(texts[:1])
+        expected, per_text_time = best_of(per_text, texts)
+        result, batched_time = best_of(parse_ne_chunks, texts)
+        assert result == expected
+        print('{:<18}{:>8}{:>12.3f}{:>12.3f}{:>9.1f}x'.format(
+            data_file.split('_')[0], len(texts), per_text_time,
+            batched_time, per_text_time / batched_time))
+
+
+if __name__ == '__main__':
+    main()
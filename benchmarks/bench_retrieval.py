@@ -0,0 +1,69 @@
+''' Compares the single page retrieval path with deep history retrieval, and
+fetching many users one after another with fetching.TimelineFetcher.
+
+Each call to the synthetic API sleeps for a simulated Twitter round trip, so
+the numbers show both the cost of the extra pages and the cleaning cost per
+tweet. Peak memory is measured with tracemalloc.
+    python -m benchmarks.bench_retrieval
+'''
+import time
+import tracemalloc
+
+from twitter_user_evaluation.tools.fetching import TimelineFetcher
+from twitter_user_evaluation.tools.retrieval import get_timeline_history, \
+    get_tweets_from_user
+
+from .synthetic import SyntheticAPI
+
+
+LATENCY = 0.05
+BUDGETS = [200, 800, 3200]
+USERS = 64
+WORKERS = [1, 4, 16, 64]
+
+
+def measure(fetch):
+    ''' Runs fetch once and returns its tweets, wall time and peak memory.
+    '''
+    tracemalloc.start()
+    start = time.perf_counter()
+    tweets = fetch()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return tweets, elapsed, peak
+
+
+def main():
+    api = SyntheticAPI(timeline_size=max(BUDGETS), latency=LATENCY)
+    api.timeline('synthetic')
+    print('{:<12}{:>8}{:>8}{:>10}{:>12}{:>12}'.format(
+        'mode', 'tweets', 'calls', 'seconds', 'us/tweet', 'peak KiB'))
+    rows = [('single', lambda: get_tweets_from_user('synthetic', api))]
+    rows += [('deep {}'.format(budget),
+              lambda budget=budget: get_timeline_history(
+                  'synthetic', api, max_tweets=budget))
+             for budget in BUDGETS]
+    for mode, fetch in rows:
+        api.calls = 0
+        tweets, elapsed, peak = measure(fetch)
+        print('{:<12}{:>8}{:>8}{:>10.3f}{:>12.1f}{:>12.1f}'.format(
+            mode, len(tweets), api.calls, elapsed,
+            1e6 * (elapsed - api.calls * LATENCY) / len(tweets),
+            peak / 1024))
+
+    users = ['user{}'.format(i) for i in range(USERS)]
+    api = SyntheticAPI(timeline_size=200, latency=LATENCY)
+    for user in users:
+        api.timeline(user)
+    print('\n{:<12}{:>8}{:>10}{:>12}'.format(
+        'workers', 'users', 'seconds', 'users/s'))
+    for workers in WORKERS:
+        fetcher = TimelineFetcher(api, workers=workers)
+        _, elapsed, _ = measure(lambda: fetcher.fetch_many(users))
+        print('{:<12}{:>8}{:>10.3f}{:>12.1f}'.format(
+            workers, USERS, elapsed, USERS / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+''' Times every analytics stage on the bundled test timelines and on synthetic
+timelines of 200, 3200 and 50,000 tweets, and saves the timings as json so
+the numbers of two versions can be compared.
+
+Each stage is run on the whole timeline REPEATS times, or once when a run
+takes longer than MAX_RUN_SECONDS, and its best and median times are kept.
+The named entity stage is timed cold, with an empty TEXT_CACHE every run.
+A stage that cannot run, e.g. without the nltk data or a model, is recorded
+with its error instead.
+    python -m benchmarks.bench_suite --output before.json
+    python -m benchmarks.bench_suite --output after.json --compare before.json
+
+--compare exits with status 1 if any stage got more than --tolerance slower
+than in the earlier results.
+'''
+import argparse
+import datetime
+import json
+import os
+import pickle
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import tweepy
+
+from twitter_user_evaluation.tools import analytics
+from twitter_user_evaluation.tools.analytics import all_ne_occurences, \
+    political_sentiment_scatter, related_hashtags, related_users, \
+    volume_by_interval
+from twitter_user_evaluation.tools.caching import TextCache
+from twitter_user_evaluation.tools.entities import parse_ne_chunk
+from twitter_user_evaluation.tools.retrieval import TweetBatch, clean_tweet
+
+from .fake_twitter import DATA_DIR, tweet_json
+from .synthetic import make_timeline
+
+
+SYNTHETIC_SIZES = [200, 3200, 50000]
+REPEATS = 5
+MAX_RUN_SECONDS = 1.0
+TOLERANCE = 0.2
+
+
+def cold_ne_occurences(batch):
+    ''' Runs all_ne_occurences with nothing in the text cache.
+    '''
+    cache = analytics.TEXT_CACHE
+    analytics.TEXT_CACHE = TextCache()
+    try:
+        return all_ne_occurences(batch)
+    finally:
+        analytics.TEXT_CACHE = cache
+
+
+STAGES = {
+    'clean_tweet': lambda statuses, batch, engine: [
+        clean_tweet(status) for status in statuses],
+    'related_hashtags': lambda statuses, batch, engine: related_hashtags(
+        batch),
+    'related_users': lambda statuses, batch, engine: related_users(batch),
+    'volume_by_interval': lambda statuses, batch, engine: volume_by_interval(
+        batch),
+    'all_ne_occurences': lambda statuses, batch, engine: cold_ne_occurences(
+        batch),
+    'parse_ne_chunk': lambda statuses, batch, engine: [
+        parse_ne_chunk(text) for text in batch.cleaned_texts],
+    'political_sentiment_scatter':
+        lambda statuses, batch, engine: political_sentiment_scatter(
+            batch, engine=engine),
+}
+
+
+def load_datasets(sizes):
+    ''' Returns the statuses of the bundled test timelines, as tweepy parses
+    them, and of synthetic timelines of the given sizes, by name.
+    '''
+    datasets = {}
+    for data_file in sorted(os.listdir(DATA_DIR)):
+        with open(os.path.join(DATA_DIR, data_file), 'rb') as f:
+            tweets = pickle.load(f)
+        datasets[data_file.split('_')[0]] = [
+            tweepy.models.Status.parse(None, tweet_json(tweet))
+            for tweet in tweets]
+    for size in sizes:
+        datasets['synthetic{}'.format(size)] = make_timeline(size)
+    return datasets
+
+
+def time_stage(stage, statuses, batch, engine):
+    ''' Returns the best and median seconds of the runs of one stage, or the
+    error that stopped it.
+    '''
+    timings = []
+    while len(timings) < REPEATS:
+        start = time.perf_counter()
+        try:
+            stage(statuses, batch, engine)
+        except Exception as error:
+            # the first line of nltk's LookupError is a row of stars
+            message = next((line.strip() for line in str(error).splitlines()
+                            if line.strip(' *')), '')
+            return {'error': '{}: {}'.format(type(error).__name__, message)}
+        timings.append(time.perf_counter() - start)
+        if timings[0] > MAX_RUN_SECONDS:
+            break
+    return {'best': min(timings), 'median': statistics.median(timings),
+            'runs': len(timings)}
+
+
+def version():
+    ''' Returns the git commit of the tree being benchmarked, if known.
+    '''
+    try:
+        return subprocess.check_output(
+            ['git', 'describe', '--always', '--dirty'],
+            stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(stages, sizes, engine):
+    ''' Times the stages on every dataset, printing each timing as it goes,
+    and returns the results.
+    '''
+    results = {}
+    print('{:<18}{:<30}{:>8}{:>12}{:>12}'.format(
+        'dataset', 'stage', 'tweets', 'best ms', 'us/tweet'))
+    for name, statuses in load_datasets(sizes).items():
+        batch = TweetBatch.from_statuses(statuses)
+        results[name] = {}
+        for stage in stages:
+            timing = time_stage(STAGES[stage], statuses, batch, engine)
+            timing['tweets'] = len(statuses)
+            results[name][stage] = timing
+            if 'error' in timing:
+                print('{:<18}{:<30}{:>8}  {}'.format(
+                    name, stage, len(statuses), timing['error'][:60]))
+            else:
+                print('{:<18}{:<30}{:>8}{:>12.2f}{:>12.2f}'.format(
+                    name, stage, len(statuses), 1000 * timing['best'],
+                    1e6 * timing['best'] / len(statuses)))
+    return {
+        'version': version(),
+        'date': datetime.datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'engine': engine or analytics.DEFAULT_ENGINE,
+        'repeats': REPEATS,
+        'results': results}
+
+
+def compare(results, baseline, tolerance):
+    ''' Prints how the best time of every stage changed since baseline and
+    returns the stages that got more than tolerance slower.
+    '''
+    regressions = []
+    print('\n{:<18}{:<30}{:>12}{:>12}{:>10}'.format(
+        'dataset', 'stage', 'before ms', 'after ms', 'ratio'))
+    for name, stages in results['results'].items():
+        for stage, timing in stages.items():
+            before = baseline['results'].get(name, {}).get(stage, {})
+            if 'best' not in timing or 'best' not in before:
+                continue
+            ratio = timing['best'] / before['best']
+            flag = ratio > 1 + tolerance
+            if flag:
+                regressions.append((name, stage, ratio))
+            print('{:<18}{:<30}{:>12.2f}{:>12.2f}{:>9.2f}x{}'.format(
+                name, stage, 1000 * before['best'], 1000 * timing['best'],
+                ratio, '  slower' if flag else ''))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--output', help='json file to save the results to')
+    parser.add_argument('--compare', metavar='JSON',
+                        help='earlier results to compare against')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help='slowdown ratio above 1 that counts as a '
+                             'regression')
+    parser.add_argument('--stages', nargs='+', choices=sorted(STAGES),
+                        default=list(STAGES))
+    parser.add_argument('--sizes', nargs='+', type=int,
+                        default=SYNTHETIC_SIZES)
+    parser.add_argument('--engine',
+                        choices=sorted(analytics.POLITICAL_ENGINES),
+                        help='political engine for the scatter stage')
+    args = parser.parse_args()
+
+    results = run(args.stages, args.sizes, args.engine)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print('\n{} stages regressed since {}'.format(
+                len(regressions), baseline.get('version')))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+''' This module provides a local stand-in for the one Twitter endpoint the app
+uses, statuses/user_timeline, so the whole app can be run and load tested
+without credentials.
+
+The bundled test timelines are replayed for their users, and every other
+user gets a synthetic timeline. Each call sleeps for latency seconds and
+counts against a per window rate limit, which is reported with the same
+x-rate-limit headers Twitter sends and answered with a 429 once spent.
+    python -m benchmarks.fake_twitter --port 8081 --latency 0.1
+    TWITTER_API_URL=http://localhost:8081 flask run
+'''
+import argparse
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import json
+import os
+import pickle
+from socketserver import ThreadingMixIn
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+from .synthetic import SyntheticAPI
+
+
+DATA_DIR = os.path.join('tests', 'test_data')
+TIMELINE_PATH = '/1.1/statuses/user_timeline.json'
+TWITTER_TIME_FORMAT = '%a %b %d %H:%M:%S +0000 %Y'
+MAX_COUNT = 200
+
+
+def status_json(status):
+    ''' Returns the parts of Twitter's json for a status that tweepy and
+    retrieval.clean_tweet read, from a synthetic status.
+    '''
+    return {
+        'id': status.id,
+        'id_str': status.id_str,
+        'user': {'id': 0, 'screen_name': status.user.screen_name},
+        'created_at': status.created_at.strftime(TWITTER_TIME_FORMAT),
+        'text': status.text,
+        'entities': status.entities,
+        'retweet_count': status.retweet_count,
+        'favorite_count': status.favorite_count}
+
+
+def tweet_json(tweet):
+    ''' Returns Twitter's json for a status from a pickled retrieval.Tweet.
+    '''
+    return {
+        'id': int(tweet.tweet_id),
+        'id_str': tweet.tweet_id,
+        'user': {'id': 0, 'screen_name': tweet.screen_name},
+        'created_at': time.strftime(TWITTER_TIME_FORMAT,
+                                    time.gmtime(tweet.time)),
+        'text': tweet.raw_text,
+        'entities': {
+            'hashtags': [{'text': hashtag}
+                         for hashtag in tweet.hashtag_mentions],
+            'user_mentions': [{'screen_name': screen_name}
+                              for screen_name in tweet.user_mentions]},
+        'retweet_count': tweet.retweets,
+        'favorite_count': tweet.favorites}
+
+
+def load_pickled_timelines(data_dir=DATA_DIR):
+    ''' Returns the bundled test timelines as json statuses, newest first,
+    keyed by the lowered screen name in their file name.
+    '''
+    timelines = {}
+    for data_file in sorted(os.listdir(data_dir)):
+        with open(os.path.join(data_dir, data_file), 'rb') as f:
+            tweets = pickle.load(f)
+        tweets.sort(key=lambda tweet: int(tweet.tweet_id), reverse=True)
+        timelines[data_file.split('_')[0].lower()] = [
+            tweet_json(tweet) for tweet in tweets]
+    return timelines
+
+
+class FakeTwitter:
+    ''' The state behind the server: the timelines, the latency and the rate
+    limit window, shared by every connection.
+
+    Users without a pickled timeline get one of synthetic_size synthetic
+    tweets, or none at all when it is 0.
+    '''
+    def __init__(self, timelines=None, synthetic_size=200, latency=0.0,
+                 limit=900, window=15 * 60):
+        self.timelines = dict(timelines or {})
+        self.synthetic = SyntheticAPI(timeline_size=synthetic_size)
+        self.latency = latency
+        self.limit = limit
+        self.window = window
+        self.calls = 0
+        self.limited = 0
+        self._used = 0
+        self._reset_at = 0
+        self._lock = threading.Lock()
+
+    def timeline(self, screen_name):
+        ''' Returns the json statuses of a user, newest first.
+        '''
+        key = screen_name.lower()
+        with self._lock:
+            if key not in self.timelines:
+                self.timelines[key] = [
+                    status_json(status) for status in
+                    self.synthetic.timeline(screen_name)
+                    ] if self.synthetic.timeline_size else []
+            return self.timelines[key]
+
+    def take_call(self):
+        ''' Counts a call against the window and returns whether it is
+        allowed, the calls remaining and the epoch second the window resets.
+        '''
+        with self._lock:
+            now = time.time()
+            if now >= self._reset_at:
+                self._used = 0
+                self._reset_at = int(now + self.window)
+            self.calls += 1
+            allowed = self._used < self.limit
+            if allowed:
+                self._used += 1
+            else:
+                self.limited += 1
+            return allowed, self.limit - self._used, self._reset_at
+
+    def user_timeline(self, params):
+        ''' Answers a user_timeline query, returning the http status, the
+        rate limit headers and the json body.
+        '''
+        allowed, remaining, reset = self.take_call()
+        headers = {'x-rate-limit-limit': str(self.limit),
+                   'x-rate-limit-remaining': str(remaining),
+                   'x-rate-limit-reset': str(reset)}
+        if not allowed:
+            return 429, headers, {'errors': [
+                {'code': 88, 'message': 'Rate limit exceeded'}]}
+        if self.latency:
+            time.sleep(self.latency)
+        since_id = int(params.get('since_id', 0))
+        max_id = int(params.get('max_id', 2 ** 63))
+        count = min(int(params.get('count', 20)), MAX_COUNT)
+        statuses = [status
+                    for status in self.timeline(params.get('screen_name', ''))
+                    if since_id < status['id'] <= max_id]
+        return 200, headers, statuses[:count]
+
+
+class FakeTwitterHandler(BaseHTTPRequestHandler):
+    ''' Serves the FakeTwitter of its server over http.
+    '''
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != TIMELINE_PATH:
+            self.respond(404, {}, {'errors': [
+                {'code': 34, 'message': 'Sorry, that page does not exist.'}]})
+            return
+        params = {name: values[0]
+                  for name, values in parse_qs(url.query).items()}
+        self.respond(*self.server.twitter.user_timeline(params))
+
+    def respond(self, code, headers, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeTwitterServer(ThreadingMixIn, HTTPServer):
+    ''' Threaded http server around a FakeTwitter, by default on a free port
+    of localhost. start runs it on a daemon thread.
+    '''
+    daemon_threads = True
+
+    def __init__(self, twitter: FakeTwitter, host='127.0.0.1', port=0):
+        super(FakeTwitterServer, self).__init__((host, port),
+                                                FakeTwitterHandler)
+        self.twitter = twitter
+
+    @property
+    def url(self):
+        return 'http://{}:{}'.format(*self.server_address[:2])
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name='fake-twitter',
+                         daemon=True).start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0.1)
+    parser.add_argument('--limit', type=int, default=900)
+    parser.add_argument('--synthetic-size', type=int, default=200)
+    args = parser.parse_args()
+    twitter = FakeTwitter(load_pickled_timelines(), args.synthetic_size,
+                          args.latency, args.limit)
+    server = FakeTwitterServer(twitter, port=args.port)
+    print('serving user_timeline on', server.url)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+''' Drives GET / of the app at a target rate and reports the p50, p95 and p99
+latency and the throughput, for capacity planning.
+
+By default the app is served in this process, with its tweepy api pointed at
+a benchmarks.fake_twitter server, so no credentials are needed. With --url
+an app that is already running, e.g. with TWITTER_API_URL pointed at
+python -m benchmarks.fake_twitter, is driven instead.
+
+Requests are sent open loop on a fixed schedule, and latency is measured
+from when each was due to be sent, so a saturated app shows up as growing
+latency rather than as a lower request rate.
+    python -m benchmarks.load_test --qps 20 --duration 30 --users 50
+'''
+import argparse
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import requests
+
+from .fake_twitter import FakeTwitter, FakeTwitterServer, \
+    load_pickled_timelines
+
+
+PERCENTILES = [50, 95, 99]
+
+
+def serve_app(latency, limit, synthetic_size):
+    ''' Starts the app in this process against a fake Twitter and returns its
+    url.
+    '''
+    for name in ['TWITTER_CK', 'TWITTER_CS', 'TWITTER_AT', 'TWITTER_ATS']:
+        os.environ.setdefault(name, 'load-test')
+    from werkzeug.serving import make_server
+    from twitter_user_evaluation.app import app
+    from twitter_user_evaluation.tools.flasks import redirect_api
+
+    twitter = FakeTwitter(load_pickled_timelines(), synthetic_size, latency,
+                          limit)
+    redirect_api(app.api, FakeTwitterServer(twitter).start().url)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='app',
+                     daemon=True).start()
+    return 'http://127.0.0.1:{}'.format(server.server_port)
+
+
+def run(url, users, query, qps, duration, concurrency):
+    ''' Sends qps requests a second for duration seconds, cycling through
+    users, and returns the latency and status of each.
+    '''
+    sessions = threading.local()
+    results = []
+
+    def send(user, due):
+        if not hasattr(sessions, 'session'):
+            sessions.session = requests.Session()
+        params = dict(query, user=user)
+        try:
+            status = sessions.session.get(url, params=params).status_code
+        except requests.RequestException as error:
+            status = type(error).__name__
+        results.append((time.perf_counter() - due, status))
+
+    total = int(qps * duration)
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        for i in range(total):
+            due = start + i / qps
+            time.sleep(max(0, due - time.perf_counter()))
+            pool.submit(send, users[i % len(users)], due)
+    return results, time.perf_counter() - start
+
+
+def report(results, elapsed, qps):
+    ''' Prints the latency percentiles, throughput and statuses of a run.
+    '''
+    latencies = np.array([latency for latency, _ in results])
+    statuses = collections.Counter(status for _, status in results)
+    print('target qps  {:>10.1f}'.format(qps))
+    print('throughput  {:>10.1f} requests/s'.format(len(results) / elapsed))
+    for percentile, value in zip(PERCENTILES,
+                                 np.percentile(latencies, PERCENTILES)):
+        print('p{:<10}{:>10.1f} ms'.format(percentile, 1000 * value))
+    print('max         {:>10.1f} ms'.format(1000 * latencies.max()))
+    print('statuses    {}'.format(dict(statuses)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--url', help='app to drive instead of a local one')
+    parser.add_argument('--qps', type=float, default=10)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--users', type=int, default=50,
+                        help='synthetic users, on top of the pickled ones')
+    parser.add_argument('--query', action='append', default=[],
+                        metavar='NAME=VALUE',
+                        help='extra query parameter, e.g. deep=true')
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--latency', type=float, default=0.1,
+                        help='seconds the fake Twitter takes per call')
+    parser.add_argument('--limit', type=int, default=900,
+                        help='calls per window the fake Twitter allows')
+    parser.add_argument('--synthetic-size', type=int, default=200)
+    args = parser.parse_args()
+
+    url = args.url or serve_app(args.latency, args.limit,
+                                args.synthetic_size)
+    users = sorted(load_pickled_timelines())
+    users += ['user{}'.format(i) for i in range(args.users)]
+    query = dict(param.split('=', 1) for param in args.query)
+    results, elapsed = run(url, users, query, args.qps, args.duration,
+                           args.concurrency)
+    report(results, elapsed, args.qps)
+
+
+if __name__ == '__main__':
+    main()
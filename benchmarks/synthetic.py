@@ -0,0 +1,81 @@
+''' This module builds synthetic tweepy statuses and a tweepy.API stand-in that
+serves them, so benchmarks can run without Twitter credentials.
+'''
+import datetime
+import random
+import time
+import types
+import zlib
+
+
+WORDS = [
+    'the', 'senate', 'vote', 'tax', 'bill', 'great', 'America', 'Python',
+    'release', 'today', 'Washington', 'economy', 'jobs', 'news', 'fake',
+    'border', 'health', 'care', 'Guido', 'conference', 'Mueller', 'China',
+    'trade', 'deal', 'people', 'very', 'strong', 'weak', 'thank', 'you']
+HASHTAGS = ['maga', 'python', 'pycon', 'news', 'tax', 'jobs', 'usa']
+HANDLES = ['gvanrossum', 'realdonaldtrump', 'dabeaz', 'foxnews', 'cnn']
+START = datetime.datetime(2018, 1, 1)
+
+
+def make_status(status_id: int, screen_name='synthetic', rng=random):
+    ''' Builds one status with the attributes retrieval.clean_tweet reads:
+    some words, maybe a hashtag, a mention and a link.
+    '''
+    hashtags = rng.sample(HASHTAGS, rng.randint(0, 2))
+    handles = rng.sample(HANDLES, rng.randint(0, 2))
+    words = [rng.choice(WORDS) for _ in range(rng.randint(5, 30))]
+    words += ['#' + hashtag for hashtag in hashtags]
+    words += ['@' + handle for handle in handles]
+    if rng.random() < 0.5:
+        words.append('https://t.co/{:010d}'.format(status_id))
+    return types.SimpleNamespace(
+        id=status_id,
+        id_str=str(status_id),
+        user=types.SimpleNamespace(screen_name=screen_name),
+        created_at=START + datetime.timedelta(hours=status_id),
+        text=' '.join(words),
+        entities={
+            'hashtags': [{'text': hashtag} for hashtag in hashtags],
+            'user_mentions': [{'screen_name': handle} for handle in handles]},
+        retweet_count=rng.randint(0, 5000),
+        favorite_count=rng.randint(0, 20000))
+
+
+def make_timeline(size: int, screen_name='synthetic', seed=0):
+    ''' Builds size statuses of one user, newest first like user_timeline.
+    '''
+    rng = random.Random(seed)
+    return [make_status(status_id, screen_name, rng)
+            for status_id in range(size, 0, -1)]
+
+
+class SyntheticAPI:
+    ''' Stand-in for tweepy.API whose user_timeline serves synthetic timelines
+    and honours count, since_id and max_id. Every call sleeps for latency
+    seconds to model the round trip to Twitter.
+    '''
+    def __init__(self, timeline_size=3200, latency=0.0):
+        self.timeline_size = timeline_size
+        self.latency = latency
+        self.calls = 0
+        self._timelines = {}
+
+    def timeline(self, screen_name):
+        ''' Returns the full synthetic timeline of screen_name.
+        '''
+        if screen_name not in self._timelines:
+            self._timelines[screen_name] = make_timeline(
+                self.timeline_size, screen_name,
+                seed=zlib.crc32(screen_name.encode()))
+        return self._timelines[screen_name]
+
+    def user_timeline(self, screen_name, count=20, since_id=None,
+                      max_id=None, **_):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        statuses = [status for status in self.timeline(screen_name)
+                    if (since_id is None or status.id > since_id)
+                    and (max_id is None or status.id <= max_id)]
+        return statuses[:min(count, 200)]
@@ -53,10 +53,10 @@ x_val = data[-num_validation_samples:]
 y_val = labels[-num_validation_samples:]
 
 print('preparing model')
-sequence_input = Input(shape=(MAX_SEQUENCE_LENGTH,), dtype='int32')
+# no fixed input length so the service can predict on shorter padding
+sequence_input = Input(shape=(None,), dtype='int32')
 embedded_sequences = Embedding(MAX_NUM_WORDS,
-                               EMBEDDING_DIM,
-                               input_length=MAX_SEQUENCE_LENGTH)(sequence_input)
+                               EMBEDDING_DIM)(sequence_input)
 x = Conv1D(128, 5, activation='relu')(embedded_sequences)
 x = MaxPooling1D(5)(x)
 x = Conv1D(128, 5, activation='relu')(x)
@@ -86,3 +86,4 @@ with open(os.path.join(TRAINED_MODELS_DIR, "conv_gmp_model.json"), "w") as f:
     f.write(model_json)
 
 model.save_weights(os.path.join(TRAINED_MODELS_DIR, "conv_gmp_model.h5"))
+model.save(os.path.join(TRAINED_MODELS_DIR, "conv_gmp_full_model.h5"))
@@ -6,6 +6,7 @@ import pickle
 from preprocess_data import get_data
 from sklearn.feature_extraction.text import CountVectorizer
 from sklearn.feature_extraction.text import TfidfTransformer
+from sklearn.pipeline import Pipeline
 from sklearn.naive_bayes import MultinomialNB
 
 
@@ -42,3 +43,10 @@ print(y_pred)
 print('save model')
 pickle.dump(clf, open(os.path.join(TRAINED_MODELS_DIR,
                                    'MultinomialNB.pickle'), 'wb'))
+
+print('save pipeline for twitter_user_evaluation/tools/models')
+pipeline = Pipeline([('vect', count_vect),
+                     ('tfidf', tfidf_transformer),
+                     ('clf', clf)])
+pickle.dump(pipeline, open(os.path.join(
+    TRAINED_MODELS_DIR, 'MultinomialNB_pipeline.pickle'), 'wb'))
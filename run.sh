@@ -1,7 +1,9 @@
 export FLASK_APP=twitter_user_evaluation
 export FLASK_DEBUG=false
-export FLASK_THREADED=false
+export FLASK_THREADED=true
 
 pip3 install -e .
+python3 -m nltk.downloader -d twitter_user_evaluation/tools/nltk_data \
+    vader_lexicon averaged_perceptron_tagger maxent_ne_chunker words punkt
 
-flask run
+flask run --with-threads
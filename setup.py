@@ -11,6 +11,9 @@ setup(
         'nltk',
         'tweepy',
     ],
+    extras_require={
+        'compact': ['brotli', 'msgpack'],
+    },
     setup_requires=[
         'pytest-runner',
     ],
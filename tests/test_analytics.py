@@ -6,8 +6,14 @@ import pytest
 import os
 
 from jsonschema import FormatChecker, validate
+import numpy as np
 import twitter_user_evaluation
-from twitter_user_evaluation.tools.analytics import analyze_tweets
+from twitter_user_evaluation.tools.analytics import BUCKET_SECONDS, \
+    CHART_ORDER, INTERVALS, POLITICAL_ENGINES, TweetAggregates, \
+    analyze_tweet_groups, analyze_tweets, compact_analysis, iter_analysis, \
+    partisan_lean, plan_charts, predict_sequences, related_hashtags, \
+    related_users, volume_by_interval
+from twitter_user_evaluation.tools.retrieval import TweetBatch
 
 
 DATA_DIR = os.path.join(os.getcwd(), 'tests', 'test_data')
@@ -21,6 +27,21 @@ SCHEMA_FILES = {
 }
 
 
+class FakeModel:
+    ''' Stand-in for a keras model that scores a sequence by its token sum,
+    which padding with zeros does not change.
+    '''
+    def __init__(self, input_length):
+        self.input_shape = (None, input_length)
+        self.batch_shapes = []
+
+    def predict(self, batch):
+        batch = np.asarray(batch)
+        self.batch_shapes.append(batch.shape)
+        total = batch.sum(axis=1, keepdims=True)
+        return np.hstack([-total, total])
+
+
 def test_chart_schemas():
     ''' Tests the API's response against the schema to be expected by the
     matching React component
@@ -34,3 +55,161 @@ def test_chart_schemas():
                 validate(charts[chart],
                          chart_schema,
                          format_checker=FormatChecker())
+
+
+def test_grouped_analysis():
+    ''' Tests that analyzing several timelines together gives the same charts
+    as analyzing them one at a time.
+    '''
+    groups = []
+    for data_file in sorted(os.listdir(DATA_DIR)):
+        with open(os.path.join(DATA_DIR, data_file), 'rb') as f:
+            groups.append(pickle.load(f))
+    for tweets, grouped in zip(groups, analyze_tweet_groups(groups)):
+        alone = analyze_tweets(tweets)
+        for chart in SCHEMA_FILES:
+            if chart != 'scatter_graph':
+                assert grouped[chart] == alone[chart]
+        for point, expected in zip(grouped['scatter_graph'],
+                                   alone['scatter_graph']):
+            assert point['id'] == expected['id']
+            assert point['data'][0]['x'] == \
+                pytest.approx(expected['data'][0]['x'], abs=1e-5)
+
+
+def test_streamed_charts():
+    ''' Tests that the charts are yielded counting charts first and are the
+    charts of analyze_tweets.
+    '''
+    with open(os.path.join(DATA_DIR, 'gvanrossum_data.pickle'), 'rb') as f:
+        tweets = pickle.load(f)
+    preds = POLITICAL_ENGINES['keras'](tweets)
+    charts = list(iter_analysis(tweets, preds))
+    names = [name for name, _ in charts]
+    assert names[:3] == list(CHART_ORDER[:3])
+    assert sorted(names[3:]) == sorted(CHART_ORDER[3:])
+    assert dict(charts) == analyze_tweets(tweets, preds)
+
+
+def test_selected_charts(monkeypatch):
+    ''' Tests that only the charts asked for are made, without running the
+    models of the others.
+    '''
+    def no_model(*_):
+        raise AssertionError('a model ran')
+    monkeypatch.setitem(POLITICAL_ENGINES, 'keras', no_model)
+    monkeypatch.setattr('twitter_user_evaluation.tools.analytics.'
+                        'ENTITY_POOL.map', no_model)
+    with open(os.path.join(DATA_DIR, 'gvanrossum_data.pickle'), 'rb') as f:
+        tweets = pickle.load(f)
+    charts = ['volume_line_graph', 'related_hashtag']
+    analysis = analyze_tweets(tweets, charts=charts)
+    assert list(analysis) == ['related_hashtag', 'volume_line_graph']
+    assert analysis['related_hashtag'] == related_hashtags(tweets)
+    assert analysis['volume_line_graph'] == volume_by_interval(tweets)
+    for grouped in analyze_tweet_groups([tweets, tweets], charts=charts):
+        assert grouped == analysis
+    with pytest.raises(ValueError):
+        plan_charts(['related_hashtag', 'word_cloud'])
+
+
+def test_compact_analysis():
+    ''' Tests that a compact analysis refers to the same tweets, by index in
+    its tweet table, as the full one does.
+    '''
+    with open(os.path.join(DATA_DIR, 'gvanrossum_data.pickle'), 'rb') as f:
+        tweets = pickle.load(f)
+    charts = ['scatter_graph', 'volume_line_graph', 'related_hashtag',
+              'related_user']
+    pol_preds = np.tile([0.25, 0.75], (len(tweets), 1))
+    analysis = analyze_tweets(tweets, pol_preds=pol_preds, charts=charts)
+    compact = compact_analysis(analysis, tweets)
+    ids, texts = compact['tweets']['ids'], compact['tweets']['texts']
+    assert len(ids) == len(texts) == len(tweets)
+    assert compact['charts']['volume_line_graph'] == \
+        analysis['volume_line_graph']
+    for name in ['related_hashtag', 'related_user']:
+        assert [(label['id'], label['value'], label['tweet_ids'])
+                for label in analysis[name]] == \
+            [(label['id'], label['value'], [ids[i] for i in label['tweets']])
+             for label in compact['charts'][name]]
+    scatter = compact['charts']['scatter_graph']
+    assert [(point['data'][0]['id'], point['data'][0]['x'],
+             point['data'][0]['y']) for point in analysis['scatter_graph']] \
+        == list(zip(range(len(tweets)), scatter['x'], scatter['y']))
+
+
+def test_bucketed_predictions():
+    ''' Tests that length bucketing keeps the order and values of the fixed
+    padding predictions while padding much less.
+    '''
+    sequences = [[1] * length for length in [3, 700, 40, 0, 180, 41, 12]]
+    fixed_model = FakeModel(1000)
+    fixed = predict_sequences(fixed_model, sequences)
+    assert fixed_model.batch_shapes == [(len(sequences), 1000)]
+
+    bucketed_model = FakeModel(None)
+    bucketed = predict_sequences(bucketed_model, sequences)
+    assert np.array_equal(fixed, bucketed)
+    assert sum(rows for rows, _ in bucketed_model.batch_shapes) == \
+        len(sequences)
+    assert sorted(length for _, length in bucketed_model.batch_shapes) == \
+        [160, 192, 704]
+
+
+def test_political_engines():
+    ''' Tests that the engines are registered and that the sklearn class
+    probabilities map onto the keras output layout.
+    '''
+    assert {'keras', 'nb', 'svm'} <= set(POLITICAL_ENGINES)
+    lean = partisan_lean(np.array([[1.0, 0.0, 0.0],
+                                   [0.0, 1.0, 0.0],
+                                   [0.2, 0.2, 0.6]]))
+    assert np.allclose(lean, [[1.0, 0.0], [0.5, 0.5], [0.3, 0.7]])
+
+
+def test_fused_counting_charts():
+    ''' Tests that the single pass aggregates give the same counting charts
+    as the per chart functions, from lists and TweetBatches alike, and leave
+    the tweets in their order.
+    '''
+    for data_file in os.listdir(DATA_DIR):
+        with open(os.path.join(DATA_DIR, data_file), 'rb') as f:
+            tweets = pickle.load(f)
+        order = [tweet.tweet_id for tweet in tweets]
+        aggregates = TweetAggregates(tweets, ['hashtags', 'users', 'volume'])
+        assert aggregates.related_hashtags() == related_hashtags(tweets)
+        assert aggregates.related_users() == related_users(tweets)
+        assert aggregates.volume_by_interval(INTERVALS) == \
+            volume_by_interval(tweets, INTERVALS)
+        assert [tweet.tweet_id for tweet in tweets] == order
+        batch = TweetAggregates(TweetBatch.from_tweets(tweets),
+                                ['hashtags', 'users', 'volume'])
+        assert batch.related_hashtags() == aggregates.related_hashtags()
+        assert batch.related_users() == aggregates.related_users()
+        assert batch.volume_by_interval() == aggregates.volume_by_interval()
+
+
+
+def test_volume_buckets():
+    ''' Tests that every tweet's favorites and retweets are charted, the
+    newest included, for intervals and fixed buckets, without reordering the
+    tweets.
+    '''
+    for data_file in os.listdir(DATA_DIR):
+        with open(os.path.join(DATA_DIR, data_file), 'rb') as f:
+            tweets = pickle.load(f)
+        order = [tweet.tweet_id for tweet in tweets]
+        total = sum(tweet.favorites + tweet.retweets for tweet in tweets)
+        for intervals in [1, INTERVALS, 100]:
+            chart = volume_by_interval(tweets, intervals)
+            assert len(chart[2]['data']) == intervals
+            assert sum(point['y'] for point in chart[2]['data']) == total
+        for bucket in ['day', 'week']:
+            chart = volume_by_interval(tweets, bucket=bucket)
+            span = max(tweet.time for tweet in tweets) - \
+                min(tweet.time for tweet in tweets)
+            assert len(chart[2]['data']) <= \
+                span // BUCKET_SECONDS[bucket] + 2
+            assert sum(point['y'] for point in chart[2]['data']) == total
+        assert [tweet.tweet_id for tweet in tweets] == order
@@ -0,0 +1,90 @@
+''' This module provides unit testing for the caching module.
+'''
+from twitter_user_evaluation.tools.caching import AnalysisCache, TextCache
+from twitter_user_evaluation.tools.retrieval import Tweet
+
+
+class FakeClock:
+    ''' Clock that only moves when told to.
+    '''
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_tweet(tweet_id):
+    ''' Builds a minimal tweet with the given id.
+    '''
+    return Tweet(tweet_id=str(tweet_id), screen_name='user', time=0,
+                 raw_text='', cleaned_text='', hashtag_mentions=[],
+                 user_mentions=[], retweets=0, favorites=0)
+
+
+def test_key_uses_newest_tweet():
+    ''' Tests that the key follows the newest tweet and ignores case.
+    '''
+    tweets = [make_tweet(9), make_tweet(100), make_tweet(12)]
+    assert AnalysisCache.key('User', tweets) == ('user', 100)
+    assert AnalysisCache.key('user', tweets + [make_tweet(101)]) \
+        != AnalysisCache.key('user', tweets)
+
+
+def test_lru_eviction():
+    ''' Tests that the least recently used entry is evicted first.
+    '''
+    cache = AnalysisCache(max_size=2, ttl=None)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['hits'] == 3
+    assert cache.stats()['misses'] == 1
+
+
+def test_ttl_expiry():
+    ''' Tests that entries older than the ttl are dropped.
+    '''
+    clock = FakeClock()
+    cache = AnalysisCache(max_size=2, ttl=10, clock=clock)
+    cache.put('a', 1)
+    clock.now = 5
+    assert cache.get('a') == 1
+    clock.now = 11
+    assert cache.get('a') is None
+    assert len(cache) == 0
+    assert cache.stats()['evictions'] == 1
+
+
+def test_text_cache_memoizes():
+    ''' Tests that results are computed once per text and namespace.
+    '''
+    calls = []
+
+    def compute(text):
+        calls.append(text)
+        return text.split()
+
+    cache = TextCache(max_size=1)
+    assert cache.get_or_compute('ne', 'a b', compute) == ['a', 'b']
+    assert cache.get_or_compute('ne', 'a b', compute) == ['a', 'b']
+    assert cache.get_or_compute('vader', 'a b', compute) == ['a', 'b']
+    assert calls == ['a b', 'a b']
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['evictions'] == 1
+
+
+def test_text_cache_survives_restarts(tmp_path):
+    ''' Tests that the SQLite layer serves results to a new cache.
+    '''
+    path = str(tmp_path / 'text_cache.sqlite')
+    TextCache(path=path).get_or_compute('vader', 'text', lambda _: 0.5)
+
+    cache = TextCache(path=path)
+    assert cache.get_or_compute('vader', 'text', lambda _: 1 / 0) == 0.5
+    assert cache.stats()['disk_hits'] == 1
@@ -0,0 +1,48 @@
+''' This module provides unit testing for the encoding module.
+'''
+import gzip
+
+import pytest
+from werkzeug.datastructures import Accept, MIMEAccept
+
+from twitter_user_evaluation.tools.encoding import JSON_MIMETYPE, \
+    MSGPACK_MIMETYPE, compress, negotiate, serialize
+
+
+PAYLOAD = {'tweets': {'ids': ['1', '2'], 'texts': ['a', 'é']},
+           'charts': {'scatter_graph': {'x': [0.5, 0.25], 'y': [3, 4]}}}
+
+
+def test_negotiate_defaults():
+    ''' Tests that clients asking for nothing in particular get plain json.
+    '''
+    assert negotiate(MIMEAccept(), Accept()) == (JSON_MIMETYPE, None)
+    assert negotiate(MIMEAccept([('text/html', 1)]),
+                     Accept([('identity', 1)])) == (JSON_MIMETYPE,
+                                                            None)
+
+
+def test_gzip_json():
+    ''' Tests that gzip is negotiated when accepted and round trips json.
+    '''
+    mimetype, encoding = negotiate(
+        MIMEAccept([('application/json', 1)]),
+        Accept([('gzip', 1), ('deflate', 0.5)]))
+    assert (mimetype, encoding) == (JSON_MIMETYPE, 'gzip')
+    body = serialize(PAYLOAD, mimetype)
+    assert gzip.decompress(compress(body, encoding)) == body
+    assert b' ' not in body
+
+
+def test_msgpack_brotli():
+    ''' Tests that MessagePack and brotli are preferred when accepted and
+    installed, and round trip the payload.
+    '''
+    msgpack = pytest.importorskip('msgpack')
+    brotli = pytest.importorskip('brotli')
+    mimetype, encoding = negotiate(
+        MIMEAccept([('application/msgpack', 1), ('application/json', 0.5)]),
+        Accept([('gzip', 1), ('br', 1)]))
+    assert (mimetype, encoding) == (MSGPACK_MIMETYPE, 'br')
+    body = brotli.decompress(compress(serialize(PAYLOAD, mimetype), encoding))
+    assert msgpack.unpackb(body, raw=False) == PAYLOAD
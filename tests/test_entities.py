@@ -0,0 +1,42 @@
+''' This module provides unit testing for the entities module.
+'''
+import os
+import pickle
+
+from nltk import ne_chunk, pos_tag, word_tokenize
+
+from twitter_user_evaluation.tools.entities import EntityPool, \
+    continuous_chunks, parse_ne_chunks
+
+
+DATA_DIR = os.path.join(os.getcwd(), 'tests', 'test_data')
+
+
+def load_texts():
+    ''' Returns the cleaned texts of the first test timeline.
+    '''
+    with open(os.path.join(DATA_DIR, sorted(os.listdir(DATA_DIR))[0]),
+              'rb') as f:
+        return [tweet.cleaned_text for tweet in pickle.load(f)]
+
+
+def test_batched_chunking():
+    ''' Tests that tagging and chunking a whole timeline at once finds the
+    same entities as nltk's per text ne_chunk(pos_tag(word_tokenize())).
+    '''
+    texts = load_texts()
+    assert parse_ne_chunks(texts) == [
+        continuous_chunks(ne_chunk(pos_tag(word_tokenize(text))))
+        for text in texts]
+
+
+def test_parallel_entities():
+    ''' Tests that the process pool finds the same entities and scores as the
+    serial path, in the same order.
+    '''
+    texts = load_texts()
+    pool = EntityPool(workers=2, min_parallel=1)
+    try:
+        assert pool.map(texts) == EntityPool(workers=0).map(texts)
+    finally:
+        pool.close()
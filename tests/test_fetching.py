@@ -0,0 +1,139 @@
+''' This module provides unit testing for the fetching module.
+'''
+import datetime
+import threading
+import time
+import types
+
+import pytest
+
+from twitter_user_evaluation.tools.fetching import RateLimitExceeded, \
+    RateWindow, TimelineFetcher
+from twitter_user_evaluation.tools.retrieval import TweetStore
+
+
+LATENCY = 0.05
+
+
+class FakeClock:
+    ''' Clock that only moves when told to.
+    '''
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class StubTimelineAPI:
+    ''' Local stand-in for the user_timeline endpoint that serves a few
+    statuses per user after a delay, and records how many calls were in
+    flight at once.
+    '''
+    def __init__(self, gate=None):
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.gate = gate
+        self.last_response = None
+        self._lock = threading.Lock()
+
+    def user_timeline(self, screen_name, count=20, since_id=None):
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        if self.gate is not None:
+            self.gate.wait()
+        time.sleep(LATENCY)
+        with self._lock:
+            self.in_flight -= 1
+        return [types.SimpleNamespace(
+            id=status_id,
+            id_str=str(status_id),
+            user=types.SimpleNamespace(screen_name=screen_name),
+            created_at=datetime.datetime(2018, 4, 20),
+            text='{} says hi'.format(screen_name),
+            entities={'hashtags': [], 'user_mentions': []},
+            retweet_count=0,
+            favorite_count=0) for status_id in range(3, 0, -1)]
+
+
+def test_fetch_many_concurrently():
+    ''' Tests that users are fetched in parallel and returned in order.
+    '''
+    api = StubTimelineAPI()
+    users = ['user{}'.format(i) for i in range(8)]
+    start = time.perf_counter()
+    timelines = TimelineFetcher(api, workers=8).fetch_many(users)
+    assert time.perf_counter() - start < len(users) * LATENCY
+    assert api.max_in_flight > 1
+    assert [timeline.screen_names[0] for timeline in timelines] == users
+
+
+def test_rate_window():
+    ''' Tests that calls past the window's limit are refused without reaching
+    the api, until the window rolls over.
+    '''
+    api = StubTimelineAPI()
+    clock = FakeClock()
+    fetcher = TimelineFetcher(api, workers=4,
+                              limiter=RateWindow(limit=3, window=60,
+                                                 clock=clock))
+    results = fetcher.fetch_many(['a', 'b', 'c', 'd', 'e'])
+    assert api.calls == 3
+    refused = [result for result in results
+               if isinstance(result, RateLimitExceeded)]
+    assert len(refused) == 2
+    assert refused[0].reset_in == 60
+
+    clock.now = 60
+    assert len(fetcher.fetch('d')) == 3
+    assert fetcher.limiter.remaining() == 2
+
+
+def test_coalesced_fetches():
+    ''' Tests that concurrent fetches of one user share a single call.
+    '''
+    gate = threading.Event()
+    api = StubTimelineAPI(gate)
+    fetcher = TimelineFetcher(api, workers=8)
+    results = []
+
+    def fetch():
+        results.append(fetcher.fetch('Someone'))
+
+    threads = [threading.Thread(target=fetch) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while fetcher.stats()['coalesced'] < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    gate.set()
+    for thread in threads:
+        thread.join()
+    assert api.calls == 1
+    assert len(results) == 5 and all(result is results[0]
+                                     for result in results)
+
+
+def test_stale_and_reported_budget():
+    ''' Tests that the window follows Twitter's headers and that a spent
+    window serves stored timelines, and fails fast for the others.
+    '''
+    api = StubTimelineAPI()
+    api.last_response = types.SimpleNamespace(headers={
+        'x-rate-limit-remaining': '1',
+        'x-rate-limit-reset': str(int(time.time()) + 120)})
+    store = TweetStore()
+    fetcher = TimelineFetcher(api, limiter=RateWindow(limit=900))
+    stored = fetcher.fetch('someone', store=store)
+    assert fetcher.limiter.remaining() == 1
+    assert 100 < fetcher.limiter.reset_in() <= 120
+
+    fetcher.fetch('other', store=store)
+    assert fetcher.fetch('someone', store=store) is stored
+    assert fetcher.stats()['stale'] == 1
+    assert api.calls == 2
+    with pytest.raises(RateLimitExceeded):
+        fetcher.fetch('nobody', store=store)
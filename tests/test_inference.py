@@ -0,0 +1,45 @@
+''' This module provides unit testing for the inference module.
+'''
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+import pytest
+
+from twitter_user_evaluation.tools.inference import BatchingPredictor
+
+
+def test_concurrent_callers_share_batches():
+    ''' Tests that concurrent callers are batched together and each gets its
+    own predictions back.
+    '''
+    calls = []
+    barrier = threading.Barrier(8)
+
+    def predict(sequences):
+        calls.append(len(sequences))
+        return [sum(sequence) for sequence in sequences]
+
+    def call(sequences):
+        barrier.wait()
+        return predictor.predict(sequences)
+
+    predictor = BatchingPredictor(predict, window=0.2)
+    requests = [[[i], [i, i]] for i in range(8)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(call, requests))
+    assert results == [[i, 2 * i] for i in range(8)]
+    assert sum(calls) == 16
+    assert len(calls) < 8
+
+
+def test_errors_reach_every_caller():
+    ''' Tests that a failing predict raises in the caller.
+    '''
+    def predict(sequences):
+        raise ValueError('bad batch')
+
+    predictor = BatchingPredictor(predict, window=0)
+    with pytest.raises(ValueError):
+        predictor.predict([[1]])
+    with pytest.raises(ValueError):
+        predictor.predict([[2]])
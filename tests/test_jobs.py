@@ -0,0 +1,75 @@
+''' This module provides unit testing for the jobs module.
+'''
+import threading
+
+import pytest
+
+from twitter_user_evaluation.tools.jobs import JobFailed, JobQueue, \
+    QueueFull, UNEXPECTED_FAILURE
+
+
+class FakeClock:
+    ''' Clock that only moves when told to.
+    '''
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_job_results():
+    ''' Tests that jobs end done with their result, or failed with the
+    message of JobFailed and nothing of other errors.
+    '''
+    jobs = JobQueue(workers=2)
+
+    def fail(error):
+        raise error
+    done = jobs.submit(lambda: {'charts': 1})
+    failed = jobs.submit(lambda: fail(JobFailed('no tweets')))
+    crashed = jobs.submit(lambda: fail(KeyError('secret')))
+    for job in [done, failed, crashed]:
+        assert job.wait(5)
+    assert done.report() == {'id': done.id, 'status': 'done',
+                             'priority': 'normal', 'result': {'charts': 1}}
+    assert failed.report()['error'] == 'no tweets'
+    assert crashed.report()['error'] == UNEXPECTED_FAILURE
+    assert jobs.get(done.id) is done
+    assert jobs.get('unknown') is None
+
+
+def test_priorities_and_bound():
+    ''' Tests that waiting jobs run highest priority first, in the order they
+    came within a priority, and that a full queue refuses more.
+    '''
+    jobs = JobQueue(workers=1, max_size=4)
+    started, gate = threading.Event(), threading.Event()
+    ran = []
+    jobs.submit(lambda: started.set() or gate.wait())
+    assert started.wait(5)
+    queued = [jobs.submit(lambda name=name: ran.append(name), priority)
+              for name, priority in [('low', 'low'), ('first', 'normal'),
+                                     ('high', 'high'), ('second', 'normal')]]
+    with pytest.raises(QueueFull):
+        jobs.submit(lambda: None)
+    assert jobs.stats()['queued'] == 4
+    gate.set()
+    for job in queued:
+        assert job.wait(5)
+    assert ran == ['high', 'first', 'second', 'low']
+
+
+def test_expiry():
+    ''' Tests that finished jobs are kept for ttl seconds and no longer.
+    '''
+    clock = FakeClock()
+    jobs = JobQueue(workers=1, ttl=60, clock=clock)
+    job = jobs.submit(lambda: None)
+    assert job.wait(5)
+    clock.now = 59
+    assert jobs.get(job.id) is job
+    clock.now = 60
+    assert jobs.get(job.id) is None
+    assert jobs.stats() == {'queued': 0, 'running': 0, 'done': 0,
+                            'failed': 0, 'expired': 1}
@@ -0,0 +1,70 @@
+''' This module provides unit testing for the metrics module.
+'''
+import pytest
+
+from twitter_user_evaluation.tools.metrics import Metrics
+
+
+def test_stage_histogram():
+    ''' Tests that stages are timed into cumulative buckets, even when they
+    raise, and that their items are counted.
+    '''
+    metrics = Metrics()
+    with metrics.stage('clean'):
+        pass
+    with pytest.raises(ValueError):
+        with metrics.stage('clean'):
+            raise ValueError
+    metrics.count('clean', 200)
+    metrics.observe('batch_size', 300, stage='predict')
+
+    text = metrics.render()
+    assert '# TYPE twitter_user_evaluation_stage_seconds histogram' in text
+    assert 'stage_seconds_bucket{le="0.001",stage="clean"} 2' in text
+    assert 'stage_seconds_bucket{le="+Inf",stage="clean"} 2' in text
+    assert 'stage_seconds_count{stage="clean"} 2' in text
+    assert 'stage_items_total{stage="clean"} 200' in text
+    assert 'batch_size_bucket{le="200",stage="predict"} 0' in text
+    assert 'batch_size_bucket{le="500",stage="predict"} 1' in text
+    assert 'batch_size_sum{stage="predict"} 300' in text
+
+
+def test_collectors_and_escaping():
+    ''' Tests that collected samples are rendered with their own type and
+    that label values are escaped.
+    '''
+    metrics = Metrics()
+
+    @metrics.register
+    def collect():
+        return [('cache_hits_total', 'counter', 'Cache hits.',
+                 {'cache': 'a "quoted"\nname'}, 3),
+                ('cache_hits_total', 'counter', 'Cache hits.',
+                 {'cache': 'text'}, 4)]
+
+    lines = metrics.render().splitlines()
+    assert lines == [
+        '# HELP twitter_user_evaluation_cache_hits_total Cache hits.',
+        '# TYPE twitter_user_evaluation_cache_hits_total counter',
+        r'twitter_user_evaluation_cache_hits_total{cache="a \"quoted\"\n'
+        r'name"} 3',
+        'twitter_user_evaluation_cache_hits_total{cache="text"} 4']
+
+
+def test_trace():
+    ''' Tests that a trace records the stages run on its thread, nested, and
+    nothing once it is over.
+    '''
+    metrics = Metrics()
+    with metrics.trace() as trace:
+        with metrics.stage('analyze_tweets'):
+            with metrics.stage('aggregate'):
+                pass
+        with metrics.stage('related_users'):
+            pass
+    with metrics.stage('clean'):
+        pass
+    assert [(entry['stage'], entry['depth']) for entry in trace] == [
+        ('analyze_tweets', 0), ('aggregate', 1), ('related_users', 0)]
+    assert 0 <= trace[0]['start'] <= trace[1]['start'] <= trace[2]['start']
+    assert trace[0]['seconds'] >= trace[1]['seconds']
@@ -0,0 +1,46 @@
+''' This module provides unit testing for the profiling module.
+'''
+from twitter_user_evaluation.tools import profiling
+from twitter_user_evaluation.tools.metrics import METRICS
+from twitter_user_evaluation.tools.profiling import ProfileStore, \
+    RequestProfile, is_internal
+
+
+def slow_sum(n):
+    ''' Does some work worth profiling.
+    '''
+    return sum(i * i for i in range(n))
+
+
+def test_request_profile():
+    ''' Tests that a profile holds the stages and the hot functions of its
+    body.
+    '''
+    with RequestProfile(top=5) as profile:
+        with METRICS.stage('analyze_tweets'):
+            slow_sum(100000)
+    report = profile.report()
+    assert [stage['stage'] for stage in report['stages']] == [
+        'analyze_tweets']
+    assert 0 < report['stages'][0]['seconds'] <= report['seconds']
+    assert len(report['hot_functions']) == 5
+    assert any(function['function'].startswith('tests/test_profiling.py')
+               for function in report['hot_functions'])
+
+    store = ProfileStore(max_size=2)
+    ids = [store.add(report) for _ in range(3)]
+    assert [stored['id'] for stored in store.all()] == ids[:0:-1]
+
+
+def test_internal_callers(monkeypatch):
+    ''' Tests that only loopback and private addresses may profile, or only
+    callers with the token once one is set.
+    '''
+    assert is_internal('127.0.0.1')
+    assert is_internal('10.1.2.3')
+    assert not is_internal('8.8.8.8')
+    assert not is_internal(None)
+
+    monkeypatch.setattr(profiling, 'PROFILE_TOKEN', 'secret')
+    assert not is_internal('127.0.0.1')
+    assert is_internal('8.8.8.8', 'secret')
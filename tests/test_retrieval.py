@@ -0,0 +1,126 @@
+''' This module provides unit testing for the retrieval module.
+'''
+import datetime
+import types
+
+import pytest
+
+from twitter_user_evaluation.tools.retrieval import Tweet, TweetBatch, \
+    TweetStore, clean_text, clean_tweet, get_timeline_history, \
+    get_tweets_from_user
+
+
+SCREEN_NAME = 'someone'
+
+
+def make_status(status_id, text='hello world'):
+    ''' Builds an object that looks enough like a tweepy status.
+    '''
+    return types.SimpleNamespace(
+        id=status_id,
+        id_str=str(status_id),
+        user=types.SimpleNamespace(screen_name=SCREEN_NAME),
+        created_at=datetime.datetime(2018, 4, 20) + \
+            datetime.timedelta(minutes=status_id),
+        text=text,
+        entities={'hashtags': [], 'user_mentions': []},
+        retweet_count=status_id,
+        favorite_count=status_id)
+
+
+class FakeAPI:
+    ''' Stand-in for tweepy.API that serves a fixed timeline and records the
+    arguments of every user_timeline call.
+    '''
+    def __init__(self, status_ids):
+        self.statuses = [make_status(i) for i in sorted(status_ids,
+                                                        reverse=True)]
+        self.calls = []
+
+    def user_timeline(self, screen_name, count=20, since_id=None,
+                      max_id=None):
+        self.calls.append({'since_id': since_id, 'max_id': max_id})
+        statuses = [status for status in self.statuses
+                    if (since_id is None or status.id > since_id)
+                    and (max_id is None or status.id <= max_id)]
+        return statuses[:count]
+
+
+def test_incremental_fetch():
+    ''' Tests that a stored timeline is only extended with newer tweets.
+    '''
+    api = FakeAPI(range(1, 11))
+    store = TweetStore()
+    tweets = get_tweets_from_user(SCREEN_NAME, api, count=5, store=store)
+    assert [tweet.tweet_id for tweet in tweets] == ['10', '9', '8', '7', '6']
+    assert api.calls[-1]['since_id'] is None
+
+    api.statuses = [make_status(12), make_status(11)] + api.statuses
+    tweets = get_tweets_from_user(SCREEN_NAME, api, count=5, store=store)
+    assert api.calls[-1]['since_id'] == 10
+    assert [tweet.tweet_id for tweet in tweets] == ['12', '11', '10', '9', '8']
+
+
+def test_store_read_only():
+    ''' Tests that callers can not reorder or edit the stored timelines.
+    '''
+    store = TweetStore()
+    tweets = get_tweets_from_user(SCREEN_NAME, FakeAPI(range(1, 4)),
+                                  store=store)
+    with pytest.raises(ValueError):
+        tweets.ids.sort()
+    assert store.max_id(SCREEN_NAME.upper()) == 3
+
+
+def test_store_bounded_users():
+    ''' Tests that the least recently requested user is dropped first.
+    '''
+    store = TweetStore(max_users=1)
+    get_tweets_from_user('first', FakeAPI([1]), store=store)
+    get_tweets_from_user('second', FakeAPI([2]), store=store)
+    assert len(store) == 1
+    assert store.max_id('first') is None
+
+
+def test_deep_history_pages():
+    ''' Tests that deep history pages backwards and honours the budget.
+    '''
+    api = FakeAPI(range(1, 501))
+    tweets = get_timeline_history(SCREEN_NAME, api, max_tweets=450)
+    assert len(tweets) == 450
+    assert [call['max_id'] for call in api.calls] == [None, 300, 100]
+    assert len({tweet.tweet_id for tweet in tweets}) == 450
+
+    api = FakeAPI(range(1, 251))
+    assert len(get_timeline_history(SCREEN_NAME, api)) == 250
+
+
+def test_tweet_batch_columns():
+    ''' Tests that a batch holds the same tweets as clean_tweet makes, and
+    that taking and joining rows keeps each tweet's mentions with it.
+    '''
+    statuses = [make_status(i) for i in range(1, 6)]
+    statuses[1].entities = {'hashtags': [{'text': 'Python'}],
+                            'user_mentions': [{'screen_name': 'guido'},
+                                              {'screen_name': 'dabeaz'}]}
+    statuses[3].entities = {'hashtags': [{'text': 'NumPy'}],
+                            'user_mentions': []}
+    tweets = [clean_tweet(status) for status in statuses]
+    batch = TweetBatch.from_statuses(statuses)
+    assert list(batch) == tweets
+    assert list(TweetBatch.from_tweets(tweets)) == tweets
+    assert list(batch.take([3, 1, 0])) == [tweets[3], tweets[1], tweets[0]]
+    assert list(batch[1:4]) == tweets[1:4]
+    assert list(TweetBatch.concat([batch[3:], batch[:3]])) == \
+        tweets[3:] + tweets[:3]
+    assert isinstance(batch[1], Tweet)
+
+
+def test_clean_text():
+    ''' Tests that handles, hashtags and whole urls are stripped, and that
+    email addresses are left alone.
+    '''
+    assert clean_text('@someone: I love #Python, https://t.co/ab/c?d=1') \
+        == ': I love ,'
+    assert clean_text('mail me@example.com') == 'mail me@example.com'
+    assert clean_text('#only @tags') == ''
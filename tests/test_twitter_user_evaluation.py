@@ -14,11 +14,19 @@ USERS_WITH_TWEETS = [
 USER_WITHOUT_TWEETS = 'stoked_'
 
 USER_ROUTE = '/?user={}'
+BATCH_ROUTE = '/batch'
+JOBS_ROUTE = '/jobs'
+JOB_ROUTE = '/jobs/{}?wait=30'
+READY_ROUTE = '/ready'
 BAD_ROUTE = '/badroute'
 BAD_REQUEST = '/?badrequest=something'
+BAD_VOLUME_REQUEST = '/?user={}&bucket=fortnight'
+BAD_CHARTS_REQUEST = '/?user={}&charts=related_hashtag,word_cloud'
 OK_RESPONSE = '200 OK'
+ACCEPTED_RESPONSE = '202 ACCEPTED'
 BAD_REQUEST_RESPONSE = '400 BAD REQUEST'
 BAD_ROUTE_RESPONSE = '404 NOT FOUND'
+NOT_READY_RESPONSE = '503 SERVICE UNAVAILABLE'
 
 
 @pytest.fixture
@@ -65,3 +73,76 @@ def test_bad_query(client):
     '''
     response = client.get(USER_ROUTE.format(USER_WITHOUT_TWEETS))
     assert response.status == BAD_REQUEST_RESPONSE
+
+
+def test_bad_volume_request(client):
+    ''' Tests the API's response given an unknown volume chart bucket.
+    '''
+    response = client.get(BAD_VOLUME_REQUEST.format(USERS_WITH_TWEETS[0]))
+    assert response.status == BAD_REQUEST_RESPONSE
+
+
+def test_bad_charts_request(client):
+    ''' Tests the API's response given an unknown chart.
+    '''
+    response = client.get(BAD_CHARTS_REQUEST.format(USERS_WITH_TWEETS[0]))
+    assert response.status == BAD_REQUEST_RESPONSE
+
+
+def test_batch_request(client):
+    ''' Tests the batch API with users with and without tweets.
+    '''
+    response = client.post(
+        BATCH_ROUTE,
+        json={'users': USERS_WITH_TWEETS + [USER_WITHOUT_TWEETS]})
+    assert response.status == OK_RESPONSE
+    analyses = response.get_json()
+    for user in USERS_WITH_TWEETS:
+        assert 'scatter_graph' in analyses[user]
+    assert isinstance(analyses[USER_WITHOUT_TWEETS], str)
+
+
+def test_bad_batch_request(client):
+    ''' Tests the batch API's response given a body without users.
+    '''
+    response = client.post(BATCH_ROUTE, json={'badrequest': 'something'})
+    assert response.status == BAD_REQUEST_RESPONSE
+
+
+def test_job_request(client):
+    ''' Tests that a queued analysis can be waited for until it is done, and
+    that a job for a user without tweets fails.
+    '''
+    response = client.post(JOBS_ROUTE, json={'user': USERS_WITH_TWEETS[0],
+                                             'priority': 'high'})
+    assert response.status == ACCEPTED_RESPONSE
+    job = response.get_json()
+    assert response.headers['Location'].endswith(job['id'])
+    job = client.get(JOB_ROUTE.format(job['id'])).get_json()
+    assert job['status'] == 'done'
+    assert 'scatter_graph' in job['result']
+
+    job = client.post(JOBS_ROUTE, json={'user': USER_WITHOUT_TWEETS})
+    job = client.get(JOB_ROUTE.format(job.get_json()['id'])).get_json()
+    assert job['status'] == 'failed'
+
+
+def test_bad_job_request(client):
+    ''' Tests the job API's responses to bodies without a user, with a bad
+    priority, and to unknown jobs.
+    '''
+    response = client.post(JOBS_ROUTE, json={'badrequest': 'something'})
+    assert response.status == BAD_REQUEST_RESPONSE
+    response = client.post(JOBS_ROUTE, json={'user': USERS_WITH_TWEETS[0],
+                                             'priority': 'urgent'})
+    assert response.status == BAD_REQUEST_RESPONSE
+    response = client.get(JOB_ROUTE.format('unknown'))
+    assert response.status == BAD_ROUTE_RESPONSE
+
+
+def test_ready(client):
+    ''' Tests that the readiness route reports the model loading state.
+    '''
+    response = client.get(READY_ROUTE)
+    assert response.status in (OK_RESPONSE, NOT_READY_RESPONSE)
+    assert response.get_json()['ready'] == (response.status == OK_RESPONSE)
@@ -2,17 +2,82 @@
 for the project's PHP backend to consume. It takes a couple queries:
     GET /?user=user
         sends back a json object with analysis of the user
+    GET /?user=user&deep=true&max_tweets=n
+        same as above but pages through up to n tweets of the user's history
+    GET /?user=user&engine=nb
+        same as above but the political sentiment comes from the named engine,
+        one of keras, nb or svm
+    GET /?user=user&intervals=n or GET /?user=user&bucket=day
+        same as above but the volume chart has n intervals, or one point per
+        hour, day or week
+    GET /?user=user&charts=related_hashtag,volume_line_graph
+        same as above but with only the named charts, and only the models
+        they need run
+    GET /?user=user&compact=true
+        same as above but every tweet is listed once, in a table of ids and
+        texts under tweets, and the charts under charts refer to tweets by
+        their index in it, the scatter chart as the x and y of every tweet
+    GET /?user=user&stream=true, or with Accept: application/x-ndjson
+        same as above but streamed as one {"chart": name, "data": chart}
+        line of json per chart, each sent as soon as it is done, cheapest
+        first
+    GET /?user=user&profile=true, or with an X-Profile: true header
+        same as above but, for internal callers, analyzed without the cache
+        under a profiler, with the stages and hottest functions added to the
+        response as profile
+    POST /batch with {"users": [user, ...], "engine": engine}
+        sends back a json object mapping each user to its analysis
+    POST /jobs with {"user": user} or {"users": [user, ...]}
+        queues the analysis of GET / or of POST /batch, taking the same
+        options plus a priority of high, normal or low, and sends back its
+        job as {"id": id, "status": "queued", ...} with a 202
+    GET /jobs/id, or GET /jobs/id?wait=n to wait up to n seconds for it
+        sends back the job's status, queued, running, done or failed, with
+        its result or error once it has one, until it expires
+Analyses are sent as MessagePack to clients accepting application/msgpack,
+and compressed with brotli or gzip for clients accepting either.
+    GET /cache
+        sends back the hit, miss and eviction counters of the analysis cache
+        and of the per text NER and VADER cache, and the rate limit budget
+    GET /metrics
+        sends back the time spent in and the tweets processed by every stage,
+        with the cache and rate limit counters, in Prometheus' text format
+    GET /profiles
+        sends back the last profiles taken, to internal callers only
+    GET /ready
+        sends back whether the models are loaded, with a 503 until they are
 '''
+import json
 import os
 
 from flask import jsonify, make_response, request
 
-from .tools.analytics import analyze_tweets
-from .tools.default_responses import BAD_QUERY_RESPONSE, BAD_QUERY_CODE, \
-    BAD_ROUTE_RESPONSE, BAD_ROUTE_CODE, NULL_QUERY_RESPONSE, NULL_QUERY_CODE, \
-    OK_QUERY_CODE
+from .tools.analytics import BUCKET_SECONDS, CHART_ORDER, DEFAULT_ENGINE, \
+    ENTITY_POOL, INTERVALS, MAX_INTERVALS, POL_PREDICTOR, POLITICAL_ENGINES, \
+    TEXT_CACHE, analyze_tweet_groups, analyze_tweets, compact_analysis, \
+    iter_analysis, plan_charts
+from .tools.caching import AnalysisCache, DEFAULT_CACHE_SIZE, \
+    DEFAULT_CACHE_TTL
+from .tools.default_responses import BAD_BATCH_CODE, BAD_BATCH_RESPONSE, \
+    BAD_CHARTS_CODE, BAD_CHARTS_RESPONSE, \
+    BAD_ENGINE_CODE, BAD_ENGINE_RESPONSE, BAD_JOB_CODE, BAD_JOB_RESPONSE, \
+    BAD_PRIORITY_CODE, BAD_PRIORITY_RESPONSE, \
+    BAD_QUERY_RESPONSE, BAD_QUERY_CODE, BAD_ROUTE_RESPONSE, BAD_ROUTE_CODE, \
+    BAD_VOLUME_CODE, BAD_VOLUME_RESPONSE, JOB_ACCEPTED_CODE, \
+    JOBS_FULL_CODE, JOBS_FULL_RESPONSE, \
+    NOT_READY_CODE, NULL_QUERY_RESPONSE, NULL_QUERY_CODE, OK_QUERY_CODE, \
+    RATE_LIMITED_CODE, RATE_LIMITED_RESPONSE
+from .tools.encoding import MIN_COMPRESS_SIZE, compress, negotiate, \
+    serialize
+from .tools.fetching import DEFAULT_FETCH_WORKERS, RateLimitExceeded, \
+    TimelineFetcher
 from .tools.flasks import FlaskWithTwitterAPI
-from .tools.retrieval import get_tweets_from_user
+from .tools.jobs import DEFAULT_PRIORITY, JOB_PRIORITIES, JobFailed, \
+    JobQueue, QueueFull
+from .tools.metrics import CONTENT_TYPE, METRICS, timed
+from .tools.profiling import ProfileStore, RequestProfile, is_internal
+from .tools.resources import RESOURCES
+from .tools.retrieval import DEFAULT_STORE_USERS, MAX_HISTORY, TweetStore
 
 
 app = FlaskWithTwitterAPI(
@@ -20,26 +85,481 @@ app = FlaskWithTwitterAPI(
     twitter_consumer_key=os.environ['TWITTER_CK'],
     twitter_consumer_secret=os.environ['TWITTER_CS'],
     twitter_access_token=os.environ['TWITTER_AT'],
-    twitter_access_token_secret=os.environ['TWITTER_ATS'],)
+    twitter_access_token_secret=os.environ['TWITTER_ATS'],
+    twitter_api_url=os.environ.get('TWITTER_API_URL'),)
+
+ANALYSIS_CACHE = AnalysisCache(
+    max_size=int(os.environ.get('ANALYSIS_CACHE_SIZE', DEFAULT_CACHE_SIZE)),
+    ttl=float(os.environ.get('ANALYSIS_CACHE_TTL', DEFAULT_CACHE_TTL)))
+TWEET_STORE = TweetStore(
+    max_users=int(os.environ.get('TWEET_STORE_USERS', DEFAULT_STORE_USERS)))
+DEEP_HISTORY_MAX_TWEETS = int(
+    os.environ.get('DEEP_HISTORY_MAX_TWEETS', MAX_HISTORY))
+BATCH_MAX_USERS = int(os.environ.get('BATCH_MAX_USERS', 500))
+# every user_timeline call goes through the fetcher and its rate limit
+TIMELINE_FETCHER = TimelineFetcher(
+    app.api,
+    workers=int(os.environ.get('BATCH_FETCH_WORKERS', DEFAULT_FETCH_WORKERS)))
+PROFILES = ProfileStore()
+JOBS = JobQueue()
+# the longest GET /jobs/id holds a Flask worker waiting for a job
+MAX_JOB_WAIT = float(os.environ.get('MAX_JOB_WAIT', 30))
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+# the named entity workers are forked before any other thread starts
+ENTITY_POOL.start()
+if os.environ.get('WARM_UP_MODELS', 'true').lower() == 'true':
+    RESOURCES.warm_up()
+
+
+def volume_options(params):
+    ''' This method reads the volume chart options from the query string or
+    json body params, returning None if they are invalid.
+    '''
+    bucket = params.get('bucket')
+    try:
+        intervals = int(params.get('intervals', INTERVALS))
+    except (TypeError, ValueError):
+        return None
+    if (bucket is not None and bucket not in BUCKET_SECONDS) \
+            or not 0 < intervals <= MAX_INTERVALS:
+        return None
+    return intervals, bucket
+
+
+def bad_volume_response():
+    ''' This method builds the response to invalid volume chart options.
+    '''
+    buckets = ', '.join(sorted(BUCKET_SECONDS))
+    return make_response(
+        jsonify(BAD_VOLUME_RESPONSE.format(MAX_INTERVALS, buckets)),
+        BAD_VOLUME_CODE)
+
+
+def chart_options(params):
+    ''' This method reads the charts asked for from the query string or json
+    body params, as a comma separated string or a list, returning them in
+    analytics.CHART_ORDER, or None if they are invalid.
+    '''
+    charts = params.get('charts', CHART_ORDER)
+    if isinstance(charts, str):
+        charts = [chart.strip() for chart in charts.split(',')]
+    try:
+        charts, _ = plan_charts(charts)
+    except (TypeError, ValueError):
+        return None
+    return charts or None
+
+
+def bad_charts_response():
+    ''' This method builds the response to a request for unknown charts.
+    '''
+    return make_response(
+        jsonify(BAD_CHARTS_RESPONSE.format(', '.join(CHART_ORDER))),
+        BAD_CHARTS_CODE)
+
+
+def encoded_response(payload, code=OK_QUERY_CODE):
+    ''' This method builds a response of payload in the format and with the
+    compression the client accepts best, see encoding.negotiate.
+    '''
+    mimetype, encoding = negotiate(request.accept_mimetypes,
+                                   request.accept_encodings)
+    body = serialize(payload, mimetype)
+    response = app.response_class(body, status=code, mimetype=mimetype)
+    if encoding is not None and len(body) >= MIN_COMPRESS_SIZE:
+        response.set_data(compress(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+    response.vary.update(['Accept', 'Accept-Encoding'])
+    return response
+
+
+def bad_engine_response():
+    ''' This method builds the response to a request for an unknown engine.
+    '''
+    engines = ', '.join(sorted(POLITICAL_ENGINES))
+    return make_response(
+        jsonify(BAD_ENGINE_RESPONSE.format(engines)), BAD_ENGINE_CODE)
+
+
+@METRICS.register
+def collect_app_metrics():
+    ''' This method reads the counters of the caches, the timeline fetcher
+    and the political model's batching for /metrics.
+    '''
+    samples = []
+    for cache, stats in [('analysis', ANALYSIS_CACHE.stats()),
+                         ('text', TEXT_CACHE.stats())]:
+        labels = {'cache': cache}
+        samples += [
+            ('cache_hits_total', 'counter', 'Cache lookups that hit.',
+             labels, stats['hits'] + stats.get('disk_hits', 0)),
+            ('cache_misses_total', 'counter', 'Cache lookups that missed.',
+             labels, stats['misses']),
+            ('cache_evictions_total', 'counter', 'Entries evicted.',
+             labels, stats['evictions']),
+            ('cache_size', 'gauge', 'Entries in the cache.',
+             labels, stats['size'])]
+    fetch = TIMELINE_FETCHER.stats()
+    predict = POL_PREDICTOR.stats()
+    samples += [
+        ('twitter_calls_remaining', 'gauge',
+         'user_timeline calls left in the rate limit window.', {},
+         fetch['remaining']),
+        ('coalesced_fetches_total', 'counter',
+         'Timeline fetches that shared a call already in flight.', {},
+         fetch['coalesced']),
+        ('stale_timelines_total', 'counter',
+         'Stored timelines served once the rate limit was spent.', {},
+         fetch['stale']),
+        ('predict_requests_total', 'counter',
+         'Requests batched into political model predict calls.', {},
+         predict['requests']),
+        ('predict_queued', 'gauge',
+         'Requests waiting for a political model predict call.', {},
+         predict['queued'])]
+    jobs = JOBS.stats()
+    samples += [
+        ('jobs', 'gauge', 'Jobs kept, by status.', {'status': status},
+         jobs[status]) for status in ['queued', 'running', 'done', 'failed']]
+    samples.append(('jobs_expired_total', 'counter',
+                    'Finished jobs forgotten after JOB_TTL.', {},
+                    jobs['expired']))
+    return samples
+
+
+def profiling_requested():
+    ''' This method tells whether the request asks to be profiled, with
+    profile=true or an X-Profile: true header, and comes from an internal
+    caller.
+    '''
+    asked = 'true' in [request.args.get('profile', '').lower(),
+                       request.headers.get('X-Profile', '').lower()]
+    return asked and is_internal(request.remote_addr,
+                                 request.headers.get('X-Profile-Token'))
 
 
 @app.route('/', methods=['GET'])
+@timed('get_analytics')
 def get_analytics():
     ''' This method handles a request of the form:
         /?user=usertoquery
-    and returns some analysis on the hashtag.
+    and returns some analysis on the hashtag. With deep=true the user's
+    history is paged through up to max_tweets tweets and engine picks the
+    political sentiment engine. The volume chart is split into intervals
+    equal intervals, or into buckets of one hour, day or week with bucket.
+
+    Requests of internal callers can ask to be profiled, see
+    profiling_requested. Their profile is stored, and added to the response
+    when it is an analysis.
     '''
-    if 'user' in request.args:
-        user = request.args['user']
-        tweets = get_tweets_from_user(user, app.api)
-    else:
+    if not profiling_requested():
+        return user_analytics(stream=streaming_requested())
+    with RequestProfile() as profile:
+        response = user_analytics(use_cache=False, encode=False)
+    report = dict(profile.report(), path=request.full_path,
+                  status=response.status_code)
+    report['id'] = PROFILES.add(report)
+    body = response.get_json()
+    if isinstance(body, dict):
+        response.set_data(jsonify(dict(body, profile=report)).get_data())
+    response.headers['X-Profile-Id'] = str(report['id'])
+    return response
+
+
+def streaming_requested():
+    ''' This method tells whether the request asks for the charts to be
+    streamed, with stream=true or by accepting only ndjson.
+    '''
+    return request.args.get('stream', 'false').lower() == 'true' \
+        or request.accept_mimetypes.best == NDJSON_MIMETYPE
+
+
+def user_analytics(use_cache=True, stream=False, encode=True):
+    ''' This method builds the response to GET /, see get_analytics. Without
+    use_cache the analysis is always made afresh, and with stream its charts
+    are streamed, see stream_analysis. Without encode the analysis is sent
+    as plain json, whatever the client accepts.
+    '''
+    engine = request.args.get('engine', DEFAULT_ENGINE)
+    if engine not in POLITICAL_ENGINES:
+        return bad_engine_response()
+    volume = volume_options(request.args)
+    if volume is None:
+        return bad_volume_response()
+    charts = chart_options(request.args)
+    if charts is None:
+        return bad_charts_response()
+
+    if 'user' not in request.args:
         return make_response(jsonify(BAD_QUERY_RESPONSE), BAD_QUERY_CODE)
+    user = request.args['user']
+    deep = request.args.get('deep', 'false').lower() == 'true'
+    tweets = user_timeline(user, deep, request.args.get(
+        'max_tweets', DEEP_HISTORY_MAX_TWEETS, type=int))
 
     if not tweets:
         return make_response(jsonify(NULL_QUERY_RESPONSE), NULL_QUERY_CODE)
 
-    response = analyze_tweets(tweets)
-    return make_response(jsonify(response), OK_QUERY_CODE)
+    key = AnalysisCache.key(user, tweets, len(tweets), engine, *volume,
+                            charts)
+    response = ANALYSIS_CACHE.get(key) if use_cache else None
+    if stream:
+        return stream_analysis(key, response, tweets, engine, volume, charts)
+    if response is None:
+        response = analyze_tweets(tweets, engine=engine, intervals=volume[0],
+                                  bucket=volume[1], charts=charts)
+        ANALYSIS_CACHE.put(key, response)
+    if request.args.get('compact', 'false').lower() == 'true':
+        response = compact_analysis(response, tweets)
+    if not encode:
+        return make_response(jsonify(response), OK_QUERY_CODE)
+    return encoded_response(response)
+
+
+def user_timeline(user, deep, max_tweets):
+    ''' This method fetches the tweets of user, paging through up to
+    max_tweets tweets of their history when deep.
+    '''
+    if deep:
+        return TIMELINE_FETCHER.history(
+            user, max_tweets=min(max_tweets, DEEP_HISTORY_MAX_TWEETS))
+    return TIMELINE_FETCHER.fetch(user, store=TWEET_STORE)
+
+
+def stream_analysis(key, cached, tweets, engine, volume, charts):
+    ''' This method builds a response streaming one line of json per chart,
+    {"chart": name, "data": chart}. The charts of a cached analysis are sent
+    at once, cheapest first; otherwise each is sent as soon as it is done,
+    see analytics.iter_analysis, and the analysis is cached once all are.
+    '''
+    def generate():
+        if cached is not None:
+            done = ((name, cached[name]) for name in charts)
+        else:
+            done = iter_analysis(tweets, engine=engine, intervals=volume[0],
+                                 bucket=volume[1], charts=charts)
+        analysis = {}
+        for name, chart in done:
+            analysis[name] = chart
+            yield json.dumps({'chart': name, 'data': chart}) + '\n'
+        if cached is None:
+            ANALYSIS_CACHE.put(key, analysis)
+    return app.response_class(generate(), status=OK_QUERY_CODE,
+                              mimetype=NDJSON_MIMETYPE)
+
+
+@app.route('/batch', methods=['POST'])
+@timed('get_batch_analytics')
+def get_batch_analytics():
+    ''' This method handles a request with a json body of the form:
+        {"users": ["firstuser", "seconduser"]}
+    which may also hold the engine, intervals, bucket, charts and compact
+    options of GET /, and returns the analysis of every user, keyed by screen
+    name. Timelines are fetched concurrently and the users that are not
+    cached are analyzed together so the political sentiment model runs once
+    for all of them.
+    '''
+    body = request.get_json(silent=True) or {}
+    users = body.get('users')
+    if not isinstance(users, list) or not users \
+            or len(users) > BATCH_MAX_USERS \
+            or not all(isinstance(user, str) for user in users):
+        return make_response(
+            jsonify(BAD_BATCH_RESPONSE.format(BATCH_MAX_USERS)),
+            BAD_BATCH_CODE)
+    engine = body.get('engine', DEFAULT_ENGINE)
+    if engine not in POLITICAL_ENGINES:
+        return bad_engine_response()
+    volume = volume_options(body)
+    if volume is None:
+        return bad_volume_response()
+    charts = chart_options(body)
+    if charts is None:
+        return bad_charts_response()
+
+    return encoded_response(batch_analysis(
+        users, engine, volume, charts, body.get('compact') is True))
+
+
+def batch_analysis(users, engine, volume, charts, compact):
+    ''' This method returns the analysis of every user, keyed by screen name,
+    or the reason it could not be made, see get_batch_analytics.
+    '''
+    users = list(dict.fromkeys(users))
+    timelines = TIMELINE_FETCHER.fetch_many(users, store=TWEET_STORE)
+
+    response = {}
+    missed = []
+    for user, tweets in zip(users, timelines):
+        if isinstance(tweets, RateLimitExceeded):
+            response[user] = RATE_LIMITED_RESPONSE.format(tweets.reset_in)
+            continue
+        if not tweets:
+            response[user] = NULL_QUERY_RESPONSE
+            continue
+        key = AnalysisCache.key(user, tweets, len(tweets), engine, *volume,
+                                charts)
+        response[user] = ANALYSIS_CACHE.get(key)
+        if response[user] is None:
+            missed.append((user, key, tweets))
+
+    if missed:
+        analyses = analyze_tweet_groups(
+            [tweets for _, _, tweets in missed], engine, *volume,
+            charts=charts)
+        for (user, key, _), analysis in zip(missed, analyses):
+            ANALYSIS_CACHE.put(key, analysis)
+            response[user] = analysis
+    if compact:
+        for user, tweets in zip(users, timelines):
+            if isinstance(response[user], dict):
+                response[user] = compact_analysis(response[user], tweets)
+    return response
+
+
+@app.route('/jobs', methods=['POST'])
+def post_job():
+    ''' This method handles a request with a json body of the form:
+        {"user": "usertoquery"} or {"users": ["firstuser", "seconduser"]}
+    which may also hold the options of GET /, for a user, or of POST /batch,
+    for users, and a priority. It queues the analysis on JOBS and sends back
+    the job, to be polled for at GET /jobs/id.
+    '''
+    body = request.get_json(silent=True) or {}
+    user, users = body.get('user'), body.get('users')
+    if not (isinstance(user, str) and users is None
+            or user is None and isinstance(users, list) and users
+            and len(users) <= BATCH_MAX_USERS
+            and all(isinstance(name, str) for name in users)):
+        return make_response(
+            jsonify(BAD_JOB_RESPONSE.format(BATCH_MAX_USERS)), BAD_JOB_CODE)
+    engine = body.get('engine', DEFAULT_ENGINE)
+    if engine not in POLITICAL_ENGINES:
+        return bad_engine_response()
+    volume = volume_options(body)
+    if volume is None:
+        return bad_volume_response()
+    charts = chart_options(body)
+    if charts is None:
+        return bad_charts_response()
+    priority = body.get('priority', DEFAULT_PRIORITY)
+    if priority not in JOB_PRIORITIES:
+        priorities = ', '.join(sorted(JOB_PRIORITIES,
+                                      key=JOB_PRIORITIES.get))
+        return make_response(
+            jsonify(BAD_PRIORITY_RESPONSE.format(priorities)),
+            BAD_PRIORITY_CODE)
+    compact = body.get('compact') is True
+
+    if users is not None:
+        def analyze():
+            return batch_analysis(users, engine, volume, charts, compact)
+    else:
+        deep = body.get('deep') is True
+        max_tweets = body.get('max_tweets', DEEP_HISTORY_MAX_TWEETS)
+        if not isinstance(max_tweets, int):
+            max_tweets = DEEP_HISTORY_MAX_TWEETS
+
+        def analyze():
+            return user_job(user, deep, max_tweets, engine, volume, charts,
+                            compact)
+    try:
+        job = JOBS.submit(analyze, priority)
+    except QueueFull:
+        return make_response(jsonify(JOBS_FULL_RESPONSE), JOBS_FULL_CODE)
+    response = make_response(jsonify(job.report()), JOB_ACCEPTED_CODE)
+    response.headers['Location'] = '/jobs/{}'.format(job.id)
+    return response
+
+
+def user_job(user, deep, max_tweets, engine, volume, charts, compact):
+    ''' This method makes the analysis of GET / for a job, failing the job
+    with the response GET / would send when there is no analysis to make.
+    '''
+    try:
+        tweets = user_timeline(user, deep, max_tweets)
+    except RateLimitExceeded as error:
+        raise JobFailed(RATE_LIMITED_RESPONSE.format(error.reset_in))
+    if not tweets:
+        raise JobFailed(NULL_QUERY_RESPONSE)
+    key = AnalysisCache.key(user, tweets, len(tweets), engine, *volume,
+                            charts)
+    analysis = ANALYSIS_CACHE.get(key)
+    if analysis is None:
+        analysis = analyze_tweets(tweets, engine=engine, intervals=volume[0],
+                                  bucket=volume[1], charts=charts)
+        ANALYSIS_CACHE.put(key, analysis)
+    return compact_analysis(analysis, tweets) if compact else analysis
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    ''' This method sends back the job with job_id, after waiting up to wait
+    seconds, at most MAX_JOB_WAIT, for it to finish. Unknown and expired
+    jobs get a 404.
+    '''
+    job = JOBS.get(job_id)
+    if job is None:
+        return not_found(None)
+    wait = min(max(request.args.get('wait', 0, type=float), 0), MAX_JOB_WAIT)
+    if wait:
+        job.wait(wait)
+    return encoded_response(job.report())
+
+
+@app.route('/cache', methods=['GET'])
+def get_cache_stats():
+    ''' This method sends back the counters of the analysis and text caches
+    and the rate limit budget of the timeline fetcher.
+    '''
+    return make_response(jsonify({
+        'analysis': ANALYSIS_CACHE.stats(),
+        'text': TEXT_CACHE.stats(),
+        'fetch': TIMELINE_FETCHER.stats()}), OK_QUERY_CODE)
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    ''' This method sends back the stage timings and counters of this process
+    for Prometheus to scrape.
+    '''
+    response = make_response(METRICS.render(), OK_QUERY_CODE)
+    response.headers['Content-Type'] = CONTENT_TYPE
+    return response
+
+
+@app.route('/profiles', methods=['GET'])
+def get_profiles():
+    ''' This method sends back the last profiles taken, newest first, to
+    internal callers. Anyone else gets a 404.
+    '''
+    if not is_internal(request.remote_addr,
+                       request.headers.get('X-Profile-Token')):
+        return not_found(None)
+    return make_response(jsonify(PROFILES.all()), OK_QUERY_CODE)
+
+
+@app.route('/ready', methods=['GET'])
+def get_readiness():
+    ''' This method tells load balancers whether the models are loaded. The
+    app answers analysis requests before that, loading models on demand.
+    '''
+    status = RESOURCES.status()
+    return make_response(
+        jsonify(status), OK_QUERY_CODE if status['ready'] else NOT_READY_CODE)
+
+
+@app.errorhandler(RateLimitExceeded)
+def rate_limited(error):
+    ''' This method tells the client when to retry a request that could not
+    be served because the rate limit to Twitter's API is spent.
+    '''
+    response = make_response(
+        jsonify(RATE_LIMITED_RESPONSE.format(error.reset_in)),
+        RATE_LIMITED_CODE)
+    response.headers['Retry-After'] = str(int(error.reset_in) + 1)
+    return response
 
 
 @app.errorhandler(BAD_ROUTE_CODE)
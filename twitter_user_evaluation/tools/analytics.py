@@ -1,58 +1,315 @@
 ''' This module provides functions for analyzing tweets.
 '''
+import collections
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import datetime
-from typing import List
+import itertools
 import os
-import pickle
-
-from keras.models import load_model
-from keras.preprocessing.sequence import pad_sequences
-import nltk
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
-from nltk import ne_chunk, pos_tag, word_tokenize
-from nltk.tree import Tree
+from typing import List
+
 import numpy as np
 
-from .retrieval import Tweet
+from .caching import DEFAULT_TEXT_CACHE_SIZE, TextCache
+from .entities import EntityPool, parse_ne_chunk
+from .inference import BatchingPredictor
+from .metrics import METRICS, timed
+from .resources import MAX_SEQUENCE_LENGTH, RESOURCES
+from .retrieval import Tweet, TweetBatch, as_batch
 
 
-# constants and file paths
+# constants
 HSL1 = "hsl(280, 70%, 50%)"
 HSL2 = "hsl(15, 70%, 50%, 1)"
 HSL3 = "hsl(175, 70%, 50%, 1)"
 INTERVALS = 15
+MAX_INTERVALS = 1000
+# fixed widths of the volume chart buckets, in seconds. Weeks start on Monday,
+# the epoch was a Thursday.
+BUCKET_SECONDS = {'hour': 3600, 'day': 86400, 'week': 604800}
+BUCKET_ORIGINS = {'week': 345600}
+BUCKET_LABELS = {'hour': '%m/%d %H:00'}
 MAX_BAR_FIELDS = 50
-POL_MODEL_DIR = os.path.join('twitter_user_evaluation', 'tools', 'models')
-POL_MODEL_TKNZR_PATH = os.path.join(POL_MODEL_DIR, 'cdo_tknzr.pickle')
-POL_MODEL_PATH = os.path.join(POL_MODEL_DIR, 'conv_dropout_model.h5')
+# models with a variable input length get sequences padded to a multiple of
+# BUCKET_WIDTH, but never shorter than the receptive field of conv_gmp_model
+BUCKET_WIDTH = 32
+MIN_BUCKET_LENGTH = 160
+# class order of the sklearn political models, see preprocess_data.py
+REPUBLICAN, NEUTRAL, DEMOCRAT = 0, 1, 2
+AGGREGATE_STAGES = ('hashtags', 'users', 'volume', 'entities')
+COUNTING_STAGES = ('hashtags', 'users', 'volume')
+# the charts of an analysis, cheapest first, and what each needs computed:
+# TweetAggregates stages, or the political sentiment predictions
+CHART_ORDER = ('related_hashtag', 'related_user', 'volume_line_graph',
+               'scatter_graph', 'named_entity_bar_graph')
+CHART_DEPENDENCIES = {
+    'related_hashtag': {'hashtags'},
+    'related_user': {'users'},
+    'volume_line_graph': {'volume'},
+    'scatter_graph': {'political'},
+    'named_entity_bar_graph': {'entities'}}
+DEFAULT_ENGINE = os.environ.get('POLITICAL_ENGINE', 'keras')
+POLITICAL_ENGINES = {}
+# per text NER and VADER results, optionally persisted to SQLite
+TEXT_CACHE = TextCache(
+    max_size=int(os.environ.get('TEXT_CACHE_SIZE', DEFAULT_TEXT_CACHE_SIZE)),
+    path=os.environ.get('TEXT_CACHE_PATH'))
+# NER_WORKERS processes for the named entity stage, serial when it is 0
+ENTITY_POOL = EntityPool()
+# threads computing the political and named entity charts of requests
+CHART_POOL = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('CHART_WORKERS', 8)),
+    thread_name_prefix='chart')
 
 
-# nltk tools and models
-nltk.download('vader_lexicon')
-nltk.download('averaged_perceptron_tagger')
-nltk.download('maxent_ne_chunker')
-nltk.download('words')
-nltk.download('punkt')
-MODEL = SentimentIntensityAnalyzer()
+@timed('analyze_tweets')
+def analyze_tweets(tweets: List[Tweet], pol_preds=None, engine=None,
+                   intervals=INTERVALS, bucket=None, charts=CHART_ORDER):
+    ''' This function takes a group of tweets and returns statistics
+    on them like average sentiment and related hashtags. Political sentiment
+    predictions already made for the tweets can be passed as pol_preds,
+    otherwise they are made by the engine named engine. The counting charts
+    all come from a single pass over the tweets, and intervals and bucket are
+    passed on to volume_by_interval. The tweets can be a list of Tweets or a
+    TweetBatch.
 
-# keras political sentiment model
-MAX_SEQUENCE_LENGTH = 1000
-with open(POL_MODEL_TKNZR_PATH, 'rb') as handle:
-    POL_MODEL_TKNZR = pickle.load(handle)
-POL_MODEL = load_model(POL_MODEL_PATH)
-POL_MODEL.predict(np.zeros((1, MAX_SEQUENCE_LENGTH)))
+    Only the named charts are made, and only the stages they need are run,
+    see plan_charts, so models are only loaded for the charts using them.
+    '''
+    tweets = as_batch(tweets)
+    METRICS.count('analyze_tweets', len(tweets))
+    return dict(iter_analysis(tweets, pol_preds, engine, intervals, bucket,
+                              charts))
 
 
-def analyze_tweets(tweets: List[Tweet]):
-    ''' This function takes a group of tweets and returns statistics
-    on them like average sentiment and related hashtags.
+def plan_charts(charts=CHART_ORDER):
+    ''' This function takes the names of charts and returns them in
+    CHART_ORDER, without repeats, with the set of stages they depend on. It
+    raises a ValueError for a name not in CHART_ORDER.
+    '''
+    unknown = set(charts) - set(CHART_ORDER)
+    if unknown:
+        raise ValueError('unknown charts: {}'.format(
+            ', '.join(sorted(unknown))))
+    charts = tuple(chart for chart in CHART_ORDER if chart in charts)
+    stages = set()
+    for chart in charts:
+        stages |= CHART_DEPENDENCIES[chart]
+    return charts, stages
+
+
+def iter_analysis(tweets: List[Tweet], pol_preds=None, engine=None,
+                  intervals=INTERVALS, bucket=None, charts=CHART_ORDER):
+    ''' This function yields the charts of analyze_tweets as (name, chart)
+    pairs, each as soon as it is done. The political scatter and the named
+    entity chart, the slow ones, are computed at the same time on CHART_POOL
+    while the counting charts are computed and yielded first. The slow
+    charts follow in the order they finish.
     '''
+    tweets = as_batch(tweets)
+    charts, stages = plan_charts(charts)
+    slow = {}
+    if 'political' in stages:
+        slow[CHART_POOL.submit(political_sentiment_scatter,
+                               tweets, pol_preds, engine)] = 'scatter_graph'
+    if 'entities' in stages:
+        slow[CHART_POOL.submit(all_ne_occurences, tweets)] = \
+            'named_entity_bar_graph'
+    aggregates = TweetAggregates(tweets, stages.intersection(COUNTING_STAGES))
+    counting = {
+        'related_hashtag': aggregates.related_hashtags,
+        'related_user': aggregates.related_users,
+        'volume_line_graph': lambda: aggregates.volume_by_interval(
+            intervals, bucket)}
+    for chart in charts:
+        if chart in counting:
+            yield chart, counting[chart]()
+    for future in as_completed(slow):
+        yield slow[future], future.result()
+
+
+def analyze_tweet_groups(groups: List[List[Tweet]], engine=None,
+                         intervals=INTERVALS, bucket=None,
+                         charts=CHART_ORDER):
+    ''' This function takes several groups of tweets, usually one per user,
+    and returns the analysis of each group in order. The political sentiment
+    model runs once over every group's tweets instead of once per group, if
+    the scatter chart is among charts.
+    '''
+    groups = [as_batch(tweets) for tweets in groups]
+    preds = None
+    if 'political' in plan_charts(charts)[1]:
+        preds = political_predictions(TweetBatch.concat(groups), engine)
+    analyses = []
+    offset = 0
+    for tweets in groups:
+        analyses.append(analyze_tweets(
+            tweets,
+            preds[offset:offset + len(tweets)] if preds is not None else None,
+            intervals=intervals, bucket=bucket, charts=charts))
+        offset += len(tweets)
+    return analyses
+
+
+def compact_analysis(analysis, tweets: List[Tweet]):
+    ''' This function takes an analysis of tweets and returns it with every
+    tweet listed once, in a table of their ids and texts, and the charts
+    under charts referring to tweets by their index in it:
+      - the pie charts keep only the id, value and the indices of their
+        tweets as tweets, their label is their id and their color HSL1
+      - the scatter chart is the x and y of every tweet, in table order
+    The volume line and named entity bar charts are left as they are.
+    '''
+    batch = as_batch(tweets)
+    ids = batch.ids.astype(str).tolist()
+    index = {tweet_id: i for i, tweet_id in reversed(list(enumerate(ids)))}
+    charts = {}
+    for name, chart in analysis.items():
+        if name in ('related_hashtag', 'related_user'):
+            chart = [{
+                'id': label['id'],
+                'value': label['value'],
+                'tweets': [index[tweet_id] for tweet_id in label['tweet_ids']],
+                } for label in chart]
+        elif name == 'scatter_graph':
+            points = [point['data'][0] for point in chart]
+            chart = {'x': [point['x'] for point in points],
+                     'y': [point['y'] for point in points]}
+        charts[name] = chart
     return {
-        'related_hashtag': related_hashtags(tweets),
-        'related_user': related_users(tweets),
-        'volume_line_graph': volume_by_interval(tweets, INTERVALS),
-        'scatter_graph': political_sentiment_scatter(tweets),
-        'named_entity_bar_graph': all_ne_occurences(tweets)}
+        'tweets': {'ids': ids, 'texts': batch.raw_texts.tolist()},
+        'charts': charts}
+
+
+class TweetAggregates:
+    ''' Accumulates everything the counting charts need in a single traversal
+    of the tweets: hashtag and user mentions, favorites and retweets over
+    time, and named entities with the sentiment of the tweets they are in.
+
+    Only the accumulators named in stages are kept, so callers that only
+    need cheap charts can leave out the named entities. Everything but the
+    mention lists is taken from the TweetBatch columns without making a Tweet
+    of each row.
+    '''
+    def __init__(self, tweets: List[Tweet] = (), stages=AGGREGATE_STAGES):
+        self.stages = frozenset(stages)
+        self.hashtag_ids = collections.defaultdict(list)
+        self.user_ids = collections.defaultdict(list)
+        self.volume_columns = []
+        self.entity_sentiments = collections.defaultdict(collections.Counter)
+        self.extend(tweets)
+
+    def extend(self, tweets: List[Tweet]):
+        ''' Adds every tweet, a list of Tweets or a TweetBatch, to the
+        accumulators.
+        '''
+        batch = as_batch(tweets)
+        with METRICS.stage('aggregate'):
+            tweet_ids = batch.ids.astype(str)
+            for stage, labels, offsets, ids_by_label in [
+                    ('hashtags', batch.hashtags, batch.hashtag_offsets,
+                     self.hashtag_ids),
+                    ('users', batch.mentions, batch.mention_offsets,
+                     self.user_ids)]:
+                if stage in self.stages:
+                    owners = tweet_ids[batch.owners(offsets)].tolist()
+                    for label, tweet_id in zip(labels.tolist(), owners):
+                        ids_by_label[label].append(tweet_id)
+            if 'volume' in self.stages:
+                self.volume_columns.append(
+                    (batch.times, batch.favorites, batch.retweets))
+        METRICS.count('aggregate', len(batch))
+        texts = []
+        if 'entities' in self.stages:
+            texts = batch.cleaned_texts.tolist()
+        for words, compound in entity_results(texts):
+            sent = 'pos' if compound >= 0 else 'neg'
+            for word in words:
+                self.entity_sentiments[word][sent] += 1
+        return self
+
+    @timed('related_hashtags')
+    def related_hashtags(self):
+        ''' Returns the hashtag pie chart, see related_hashtags.
+        '''
+        return pie_chart(self.hashtag_ids)
+
+    @timed('related_users')
+    def related_users(self):
+        ''' Returns the user pie chart, see related_users.
+        '''
+        return pie_chart(self.user_ids)
+
+    @timed('volume_by_interval')
+    def volume_by_interval(self, intervals: int = INTERVALS, bucket=None):
+        ''' Returns the volume line chart, see volume_by_interval.
+        '''
+        times, favorites, retweets = (
+            np.concatenate(column).astype(np.int64) for column in
+            zip(*self.volume_columns or [([], [], [])]))
+        starts, width = np.zeros(0), 0
+        if len(times) and bucket is None:
+            first, last = times.min(), times.max()
+            width = (last - first) / intervals
+            starts = first + width * np.arange(intervals)
+            # the newest tweet belongs to the last interval, not one past it
+            index = np.minimum(
+                ((times - first) / (width or 1)).astype(np.int64),
+                intervals - 1)
+        elif len(times):
+            width = BUCKET_SECONDS[bucket]
+            index = (times - BUCKET_ORIGINS.get(bucket, 0)) // width
+            # only the newest MAX_INTERVALS buckets are charted
+            first = max(index.min(), index.max() - MAX_INTERVALS + 1)
+            kept = index >= first
+            index, favorites, retweets = (
+                index[kept] - first, favorites[kept], retweets[kept])
+            intervals = int(index.max()) + 1
+            starts = BUCKET_ORIGINS.get(bucket, 0) + width * (
+                first + np.arange(intervals))
+        if len(starts):
+            favorites = np.bincount(index, favorites, intervals)
+            retweets = np.bincount(index, retweets, intervals)
+        labels = [datetime.datetime.fromtimestamp(start + width / 2).strftime(
+                      BUCKET_LABELS.get(bucket, '%m/%d')) for start in starts]
+        series = [('Favorites', HSL1, favorites),
+                  ('Retweets', HSL2, retweets),
+                  ('Totals', HSL3, favorites + retweets)]
+        return [{
+            'id': name,
+            'color': color,
+            'data': [{'color': color, 'x': label, 'y': y} for label, y in
+                     zip(labels, tallies.astype(np.int64).tolist())],
+            } for name, color, tallies in series]
+
+    @timed('all_ne_occurences')
+    def all_ne_occurences(self):
+        ''' Returns the named entity bar chart, see all_ne_occurences.
+        '''
+        bars = [{
+            'id': word,
+            'positive_occurences': occurences['pos'],
+            'positive_occurencesColor': HSL2,
+            'negative_occurences': occurences['neg'],
+            'negative_occurencesColor': HSL1,
+            } for word, occurences in self.entity_sentiments.items()]
+        bars.sort(key=lambda x: -(x['positive_occurences'] +
+                                  x['negative_occurences']))
+        return bars[:MAX_BAR_FIELDS]
+
+
+def pie_chart(tweet_ids_by_label):
+    ''' Function takes a mapping from labels to the ids of the tweets they
+    appear in and returns a list of dictionaries that, when jsonified, renders
+    as this React comonent:
+        http://nivo.rocks/#/pie
+    '''
+    return [{
+        'id': label,
+        'label': label,
+        'value': len(ids),
+        'color': HSL1,
+        'tweet_ids': ids,
+        } for label, ids in tweet_ids_by_label.items()]
 
 
 def related_hashtags(tweets: List[Tweet]):
@@ -62,21 +319,7 @@ def related_hashtags(tweets: List[Tweet]):
     this React comonent:
         http://nivo.rocks/#/pie
     '''
-    hashtag_occurences = {}
-    for tweet in tweets:
-        for hashtag in tweet.hashtag_mentions:
-            if hashtag in hashtag_occurences:
-                hashtag_occurences[hashtag][0] += 1
-                hashtag_occurences[hashtag][1].append(tweet.tweet_id)
-            else:
-                hashtag_occurences[hashtag] = [1, [tweet.tweet_id]]
-    return [{
-        'id': hashtag,
-        'label': hashtag,
-        'value': occurences,
-        'color': HSL1,
-        'tweet_ids': ids,
-        } for hashtag, (occurences, ids) in hashtag_occurences.items()]
+    return TweetAggregates(tweets, ['hashtags']).related_hashtags()
 
 
 def related_users(tweets: List[Tweet]):
@@ -86,21 +329,7 @@ def related_users(tweets: List[Tweet]):
     this React comonent:
         http://nivo.rocks/#/pie
     '''
-    user_occurences = {}
-    for tweet in tweets:
-        for screen_name in tweet.user_mentions:
-            if screen_name in user_occurences:
-                user_occurences[screen_name][0] += 1
-                user_occurences[screen_name][1].append(tweet.tweet_id)
-            else:
-                user_occurences[screen_name] = [1, [tweet.tweet_id]]
-    return [{
-        'id': user,
-        'label': user,
-        'value': occurences,
-        'color': HSL1,
-        'tweet_ids': ids,
-        } for user, (occurences, ids) in user_occurences.items()]
+    return TweetAggregates(tweets, ['users']).related_users()
 
 
 def popularity(tweet: Tweet):
@@ -109,47 +338,44 @@ def popularity(tweet: Tweet):
     return tweet.favorites + tweet.retweets
 
 
-def volume_by_interval(tweets: List[Tweet], intervals: int):
+def entity_results(texts: List[str]):
+    ''' Function takes a list of texts and returns the named entities and
+    VADER compound score of each, see entities.analyze_texts. Results come
+    from TEXT_CACHE when possible; the rest are computed by ENTITY_POOL, once
+    per distinct text, and cached.
+    '''
+    results = [(TEXT_CACHE.get('ne', text), TEXT_CACHE.get('vader', text))
+               for text in texts]
+    missing = list(dict.fromkeys(
+        text for text, (words, compound) in zip(texts, results)
+        if words is None or compound is None))
+    computed = {}
+    if missing:
+        with METRICS.stage('entity_pool'):
+            computed = dict(zip(missing, ENTITY_POOL.map(missing)))
+        METRICS.count('entity_pool', len(missing))
+        METRICS.observe('batch_size', len(missing), stage='entity_pool')
+    for text, (words, compound) in computed.items():
+        TEXT_CACHE.put('ne', text, words)
+        TEXT_CACHE.put('vader', text, compound)
+    return [computed.get(text, result) for text, result in zip(texts, results)]
+
+
+def volume_by_interval(tweets: List[Tweet], intervals: int = INTERVALS,
+                       bucket=None):
     ''' This function takes a list of tweets and locates the newest and oldest
     tweets in the bunch. It then breaks the length of time between these into
-    intervals and returns the average sentiment of tweets per interval.
+    intervals and returns the favorites and retweets of the tweets per
+    interval. With a bucket from BUCKET_SECONDS the intervals are instead one
+    hour, day or week each, and only the newest MAX_INTERVALS of them are
+    kept.
 
     What it returns is a dictionary that, when jsonified renders this React
     component.
         http://nivo.rocks/#/line
     '''
-    favorites_by_interval = {'id': 'Favorites', 'color': HSL1, 'data': []}
-    retweets_by_interval = {'id': 'Retweets', 'color': HSL2, 'data': []}
-    totals_by_interval = {'id': 'Totals', 'color': HSL3, 'data': []}
-    tweets.sort(key=lambda tweet: tweet.time)
-    interval_length = (tweets[-1].time - tweets[0].time) / intervals
-    current_interval = tweets[0].time + interval_length
-    current_favorites_tally = current_retweets_tally = 0
-    for tweet in tweets:
-        if tweet.time > current_interval:
-            favorites_by_interval['data'].append({
-                'color': HSL1,
-                'x': datetime.datetime.fromtimestamp(
-                    current_interval - (interval_length / 2)).strftime('%m/%d'),
-                'y': current_favorites_tally})
-            retweets_by_interval['data'].append({
-                'color': HSL2,
-                'x': datetime.datetime.fromtimestamp(
-                    current_interval - (interval_length / 2)).strftime('%m/%d'),
-                'y': current_retweets_tally})
-            totals_by_interval['data'].append({
-                'color': HSL3,
-                'x': datetime.datetime.fromtimestamp(
-                    current_interval - (interval_length / 2)).strftime('%m/%d'),
-                'y': (current_favorites_tally + current_retweets_tally)})
-            current_interval += interval_length
-            current_favorites_tally = current_retweets_tally = 0
-        current_favorites_tally += tweet.favorites
-        current_retweets_tally += tweet.retweets
-    return [
-        favorites_by_interval,
-        retweets_by_interval,
-        totals_by_interval]
+    return TweetAggregates(tweets, ['volume']).volume_by_interval(
+        intervals, bucket)
 
 
 def all_ne_occurences(tweets: List[Tweet]):
@@ -159,68 +385,119 @@ def all_ne_occurences(tweets: List[Tweet]):
     this React comonent:
         http://nivo.rocks/#/bar
     '''
-    word_occurences = {}
-    for tweet in tweets:
-        cleaned_text = parse_ne_chunk(tweet.cleaned_text)
-        if MODEL.polarity_scores(tweet.cleaned_text)['compound'] >= 0:
-            sent = 'pos'
-        else:
-            sent = 'neg'
-        for word in cleaned_text:
-            if word in word_occurences:
-                word_occurences[word][sent] += 1
-            else:
-                word_occurences[word] = {
-                    'pos': 0,
-                    'neg': 0}
-                word_occurences[word][sent] += 1
-    return sorted([{
-        'id': word,
-        'positive_occurences': occurences['pos'],
-        'positive_occurencesColor': HSL2,
-        'negative_occurences': occurences['neg'],
-        'negative_occurencesColor': HSL1,
-        } for word, occurences in word_occurences.items()],
-                  key=lambda x: -(x['positive_occurences'] + \
-                                  x['negative_occurences']))[:MAX_BAR_FIELDS]
-
-
-def parse_ne_chunk(text):
-    ''' Takes texts and finds the named entities
-
-    why write it when it's already there.
-    credit on so:
-        /questions/31836058/nltk-named-entity-recognition-to-a-python-list
-    '''
-    chunked = ne_chunk(pos_tag(word_tokenize(text)))
-    continuous_chunk = []
-    current_chunk = []
-    for i in chunked:
-        if isinstance(i, Tree):
-            current_chunk.append(" ".join([token for token, pos in i.leaves()]))
-        elif current_chunk:
-            named_entity = " ".join(current_chunk)
-            if named_entity not in continuous_chunk:
-                continuous_chunk.append(named_entity)
-                current_chunk = []
-    return continuous_chunk
-
-
-def political_sentiment_scatter(tweets: List[Tweet]):
+    return TweetAggregates(tweets, ['entities']).all_ne_occurences()
+
+
+def political_engine(name: str):
+    ''' Decorator that registers a function as the political sentiment engine
+    called name. An engine takes a list of tweets and returns one row per
+    tweet whose second column is the tweet's lean, between 0 and 1.
+    '''
+    def register(engine):
+        POLITICAL_ENGINES[name] = engine
+        return engine
+    return register
+
+
+def political_predictions(tweets: List[Tweet], engine=None):
+    ''' Function takes a list of tweets or a TweetBatch and returns the
+    political sentiment predictions of the named engine, or DEFAULT_ENGINE,
+    one row per tweet.
+    '''
+    with METRICS.stage('political_predictions'):
+        preds = POLITICAL_ENGINES[engine or DEFAULT_ENGINE](tweets)
+    METRICS.count('political_predictions', len(preds))
+    return preds
+
+
+@political_engine('keras')
+def keras_predictions(tweets: List[Tweet]):
+    ''' The Conv1D keras model, through the micro-batching POL_PREDICTOR.
+    '''
+    with METRICS.stage('tokenize'):
+        sequences = RESOURCES.pol_model_tknzr.texts_to_sequences(
+            as_batch(tweets).raw_texts.tolist())
+    return POL_PREDICTOR.predict(sequences)
+
+
+@political_engine('nb')
+def naive_bayes_predictions(tweets: List[Tweet]):
+    ''' The CountVectorizer, TF-IDF and MultinomialNB sklearn pipeline.
+    '''
+    return partisan_lean(RESOURCES.nb_pipeline.predict_proba(
+        as_batch(tweets).cleaned_texts.tolist()))
+
+
+@political_engine('svm')
+def linear_svm_predictions(tweets: List[Tweet]):
+    ''' The CountVectorizer, TF-IDF and linear SVM sklearn pipeline. The SVM
+    has no probabilities so its decision function goes through a softmax.
+    '''
+    scores = RESOURCES.svm_pipeline.decision_function(
+        as_batch(tweets).cleaned_texts.tolist())
+    scores = np.exp(scores - scores.max(axis=1, keepdims=True))
+    return partisan_lean(scores / scores.sum(axis=1, keepdims=True))
+
+
+def partisan_lean(probs):
+    ''' Function maps republican, neutral and democrat probabilities to rows
+    shaped like the keras model's output, counting neutral as half of each.
+    '''
+    lean = probs[:, DEMOCRAT] + probs[:, NEUTRAL] / 2
+    return np.column_stack([1 - lean, lean])
+
+
+def predict_sequences(model, sequences: List[List[int]]):
+    ''' Function runs a keras model over token sequences and returns one row of
+    predictions per sequence, in order.
+
+    Models built with a fixed input length get every sequence padded to it.
+    Models that take any length get the sequences grouped into buckets of
+    similar length instead, each padded only to its own bucket's length, so
+    tweets of ~50 tokens are not padded to MAX_SEQUENCE_LENGTH.
+    '''
+    from keras.preprocessing.sequence import pad_sequences
+    input_length = model.input_shape[1]
+    if input_length is not None or not sequences:
+        return model.predict(pad_sequences(
+            sequences, maxlen=input_length or MAX_SEQUENCE_LENGTH))
+
+    def bucket_length(i):
+        length = -(-len(sequences[i]) // BUCKET_WIDTH) * BUCKET_WIDTH
+        return min(max(length, MIN_BUCKET_LENGTH), MAX_SEQUENCE_LENGTH)
+
+    order = sorted(range(len(sequences)), key=bucket_length)
+    preds = [None] * len(sequences)
+    for length, indices in itertools.groupby(order, key=bucket_length):
+        indices = list(indices)
+        batch = pad_sequences([sequences[i] for i in indices], maxlen=length)
+        for i, pred in zip(indices, model.predict(batch)):
+            preds[i] = pred
+    return np.array(preds)
+
+
+# concurrent requests share predict calls on the political sentiment model
+POL_PREDICTOR = BatchingPredictor(
+    lambda sequences: predict_sequences(RESOURCES.pol_model, sequences))
+
+
+@timed('political_sentiment_scatter')
+def political_sentiment_scatter(tweets: List[Tweet], preds=None,
+                                engine=None):
     ''' Function takes a list of tweets and returns a bunch of data. It's the
     sentiment, polarity and political sentiment of the tweets but organized in
     a strange way so that when jsonified, it renders as this React component:
         http://nivo.rocks/#/scatterplot/
     '''
-    sequences = POL_MODEL_TKNZR.texts_to_sequences(
-        [tweet.raw_text for tweet in tweets])
-    sequences = pad_sequences(sequences, maxlen=MAX_SEQUENCE_LENGTH)
-    global POL_MODEL
-    preds = POL_MODEL.predict(sequences)
+    batch = as_batch(tweets)
+    if preds is None:
+        preds = political_predictions(batch, engine)
+    popularities = (batch.favorites + batch.retweets).tolist()
     return [{
-        'id': tweet.raw_text,
+        'id': raw_text,
         'data': [{
             'id': i,
-            'y': popularity(tweet),
+            'y': y,
             'x': float(pol_sent[1]),
-        }]} for i, (tweet, pol_sent) in enumerate(zip(tweets, preds))]
+        }]} for i, (raw_text, y, pol_sent) in enumerate(
+            zip(batch.raw_texts, popularities, preds))]
@@ -0,0 +1,205 @@
+''' This module provides caches that let the app skip work it has already done.
+'''
+import collections
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from .retrieval import as_batch
+
+
+DEFAULT_CACHE_SIZE = 128
+DEFAULT_CACHE_TTL = 300
+DEFAULT_TEXT_CACHE_SIZE = 100000
+
+
+class AnalysisCache:
+    ''' Bounded LRU cache with a time to live for the charts returned by
+    analytics.analyze_tweets.
+
+    Entries are keyed by a screen name and the newest tweet id seen for that
+    user, so a repeat query for an unchanged timeline skips the analysis
+    completely while a new tweet naturally produces a new key.
+    '''
+    def __init__(self,
+                 max_size=DEFAULT_CACHE_SIZE,
+                 ttl=DEFAULT_CACHE_TTL,
+                 clock=time.monotonic):
+        ''' Initializes an empty cache holding at most max_size entries, each
+        of which lives for ttl seconds. A ttl of None disables expiry.
+        '''
+        assert max_size > 0
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(screen_name: str, tweets, *options):
+        ''' Builds the cache key for a user's timeline. Screen names are case
+        insensitive on Twitter so they are lowered here. Any options that
+        change the analysis, like the retrieval mode, are appended.
+        '''
+        ids = as_batch(tweets).ids
+        newest = int(ids.max()) if len(ids) else None
+        return (screen_name.lower(), newest) + options
+
+    def get(self, key):
+        ''' Returns the cached value for key or None, counting the lookup as a
+        hit or a miss. Expired entries are dropped and count as evictions.
+        '''
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if self.ttl is None or self._clock() - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.evictions += 1
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        ''' Stores value under key, evicting the least recently used entries
+        when the cache is full.
+        '''
+        with self._lock:
+            self._entries[key] = (self._clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        ''' Drops every entry. The counters are kept.
+        '''
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        ''' Returns the cache counters as a dictionary ready to be jsonified.
+        '''
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions}
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class TextCache:
+    ''' Memoizes the results of expensive per text NLP calls, like named
+    entity chunking and VADER scores, keyed by a hash of the text.
+
+    Results live in a bounded in-memory LRU. When a path is given they are
+    also written to a SQLite database there, which survives restarts and is
+    read whenever the in-memory layer misses. Results must be json
+    serializable.
+    '''
+    def __init__(self, max_size=DEFAULT_TEXT_CACHE_SIZE, path=None):
+        assert max_size > 0
+        self.max_size = max_size
+        self.path = path
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute('CREATE TABLE IF NOT EXISTS text_cache '
+                             '(key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+            self._db.commit()
+
+    @staticmethod
+    def key(namespace: str, text: str):
+        ''' Builds the key of text's result for the function namespace names.
+        '''
+        digest = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        return '{}:{}'.format(namespace, digest)
+
+    def get(self, namespace: str, text: str):
+        ''' Returns the cached result for text in namespace, or None.
+        '''
+        key = self.key(namespace, text)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            if self._db is not None:
+                row = self._db.execute(
+                    'SELECT value FROM text_cache WHERE key = ?',
+                    (key,)).fetchone()
+                if row is not None:
+                    self.disk_hits += 1
+                    value = json.loads(row[0])
+                    self._remember(key, value)
+                    return value
+            self.misses += 1
+            return None
+
+    def put(self, namespace: str, text: str, value):
+        ''' Stores the result for text in namespace.
+        '''
+        key = self.key(namespace, text)
+        with self._lock:
+            self._remember(key, value)
+            if self._db is not None:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO text_cache VALUES (?, ?)',
+                    (key, json.dumps(value)))
+                self._db.commit()
+
+    def get_or_compute(self, namespace: str, text: str, compute):
+        ''' Returns the cached result of compute(text), computing and storing
+        it on a miss.
+        '''
+        value = self.get(namespace, text)
+        if value is None:
+            value = compute(text)
+            self.put(namespace, text, value)
+        return value
+
+    def _remember(self, key, value):
+        ''' Puts a value in the in-memory layer, evicting the least recently
+        used entries when it is full. The lock must be held.
+        '''
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        ''' Returns the cache counters as a dictionary ready to be jsonified.
+        '''
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'path': self.path,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions}
+
+    def __len__(self):
+        return len(self._entries)
@@ -4,11 +4,39 @@
 OK_QUERY_CODE = 200
 OK_QUERY_RESPONSE = 'OK'
 
+NOT_READY_CODE = 503
+
 NULL_QUERY_CODE = 400
 NULL_QUERY_RESPONSE = 'Query returned no tweets.'
 
 BAD_QUERY_CODE = 400
 BAD_QUERY_RESPONSE = 'Request was not for a user.'
 
+BAD_BATCH_CODE = 400
+BAD_BATCH_RESPONSE = 'Request was not for a list of at most {} users.'
+
+BAD_ENGINE_CODE = 400
+BAD_ENGINE_RESPONSE = 'Engine must be one of: {}.'
+
+BAD_VOLUME_CODE = 400
+BAD_VOLUME_RESPONSE = 'Volume needs 1 to {} intervals or a bucket of: {}.'
+
+BAD_CHARTS_CODE = 400
+BAD_CHARTS_RESPONSE = 'Charts must be some of: {}.'
+
+JOB_ACCEPTED_CODE = 202
+
+BAD_JOB_CODE = 400
+BAD_JOB_RESPONSE = 'Job was not for a user or a list of at most {} users.'
+
+BAD_PRIORITY_CODE = 400
+BAD_PRIORITY_RESPONSE = 'Priority must be one of: {}.'
+
+JOBS_FULL_CODE = 503
+JOBS_FULL_RESPONSE = 'Too many jobs are queued, retry later.'
+
+RATE_LIMITED_CODE = 429
+RATE_LIMITED_RESPONSE = 'Twitter rate limit reached, retry in {:.0f} seconds.'
+
 BAD_ROUTE_CODE = 404
 BAD_ROUTE_RESPONSE = 'Bad route'
@@ -0,0 +1,66 @@
+''' This module encodes responses as compactly as each client allows: as
+MessagePack instead of json when it accepts it, and compressed with brotli
+or gzip when it accepts either.
+
+msgpack and brotli are optional, see the compact extra of setup.py. Without
+them responses are json, compressed with gzip.
+'''
+import gzip
+import os
+
+from flask import json
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPE = 'application/msgpack'
+# smaller bodies are sent as they are, compressing them saves next to nothing
+MIN_COMPRESS_SIZE = int(os.environ.get('MIN_COMPRESS_SIZE', 1024))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', 5))
+
+
+def mimetypes():
+    ''' Returns the formats responses can be sent in, json first.
+    '''
+    return [JSON_MIMETYPE] + ([MSGPACK_MIMETYPE] if msgpack else [])
+
+
+def content_encodings():
+    ''' Returns the compressions responses can be sent with, best first.
+    '''
+    return (['br'] if brotli else []) + ['gzip']
+
+
+def negotiate(accept_mimetypes, accept_encodings):
+    ''' Takes the parsed Accept and Accept-Encoding headers of a request and
+    returns the format to send it and the compression to use, or None for
+    none.
+    '''
+    mimetype = accept_mimetypes.best_match(mimetypes()) or JSON_MIMETYPE
+    return mimetype, accept_encodings.best_match(content_encodings())
+
+
+def serialize(payload, mimetype=JSON_MIMETYPE):
+    ''' Returns payload serialized as json, the way flask.jsonify does
+    outside debug mode, or as MessagePack.
+    '''
+    if mimetype == MSGPACK_MIMETYPE:
+        return msgpack.packb(payload, use_bin_type=True)
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+
+def compress(body: bytes, encoding: str):
+    ''' Returns body compressed with encoding, gzip or br.
+    '''
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, GZIP_LEVEL)
@@ -0,0 +1,131 @@
+''' This module provides the named entity and sentiment stage of the analytics,
+serially or spread over a pool of worker processes.
+
+The pool forks its workers, so it is only available where the fork start
+method is (Linux, which is what the Dockerfile runs), and it should be
+started before other threads are.
+'''
+import multiprocessing
+import os
+import threading
+
+from nltk.tree import Tree
+
+from .metrics import METRICS
+from .resources import RESOURCES
+
+
+DEFAULT_NER_WORKERS = int(os.environ.get('NER_WORKERS', 0))
+DEFAULT_MIN_PARALLEL = int(os.environ.get('NER_MIN_PARALLEL', 64))
+CHUNKS_PER_WORKER = 4
+
+
+def parse_ne_chunk(text):
+    ''' Takes texts and finds the named entities
+
+    why write it when it's already there.
+    credit on so:
+        /questions/31836058/nltk-named-entity-recognition-to-a-python-list
+    '''
+    return parse_ne_chunks([text])[0]
+
+
+def parse_ne_chunks(texts):
+    ''' Takes a list of texts and finds the named entities of each, like
+    parse_ne_chunk, but tags and chunks the whole list in one call each, the
+    way nltk's pos_tag_sents and ne_chunk_sents do.
+    '''
+    tagged = RESOURCES.pos_tagger.tag_sents(
+        [RESOURCES.word_tokenizer(text) for text in texts])
+    return [continuous_chunks(chunked)
+            for chunked in RESOURCES.ne_chunker.parse_sents(tagged)]
+
+
+def continuous_chunks(chunked):
+    ''' Takes a chunked sentence and returns its named entities, in order of
+    first appearance.
+    '''
+    continuous_chunk = []
+    current_chunk = []
+    for i in chunked:
+        if isinstance(i, Tree):
+            current_chunk.append(" ".join([token for token, pos in i.leaves()]))
+        elif current_chunk:
+            named_entity = " ".join(current_chunk)
+            if named_entity not in continuous_chunk:
+                continuous_chunk.append(named_entity)
+                current_chunk = []
+    return continuous_chunk
+
+
+def sentiment_score(text):
+    ''' Takes a text and returns its VADER compound score.
+    '''
+    return RESOURCES.sentiment_model.polarity_scores(text)['compound']
+
+
+def analyze_texts(texts):
+    ''' Takes a list of texts and returns the named entities and the VADER
+    compound score of each. Its stages are timed in the process it runs in,
+    so those of pool workers are not in the app's metrics.
+    '''
+    with METRICS.stage('ner'):
+        entities = parse_ne_chunks(texts)
+    with METRICS.stage('vader'):
+        scores = [sentiment_score(text) for text in texts]
+    METRICS.count('ner', len(texts))
+    METRICS.count('vader', len(texts))
+    return list(zip(entities, scores))
+
+
+def _warm_worker():
+    ''' Loads the nltk models once when a worker process starts.
+    '''
+    RESOURCES.after_fork()
+    for name in ['word_tokenizer', 'pos_tagger', 'ne_chunker',
+                 'sentiment_model']:
+        getattr(RESOURCES, name)
+
+
+class EntityPool:
+    ''' Runs analyze_texts over many texts. Batches of at least min_parallel
+    texts are split into chunks and spread over workers processes, each of
+    which loads the tagger, chunker and VADER once when it starts; smaller
+    batches, or any batch when workers is 0, run serially in this process.
+    '''
+    def __init__(self,
+                 workers=DEFAULT_NER_WORKERS,
+                 min_parallel=DEFAULT_MIN_PARALLEL):
+        self.workers = workers
+        self.min_parallel = min_parallel
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        ''' Forks and warms up the worker processes, if there are any.
+        '''
+        with self._lock:
+            if self._pool is None and self.workers > 0:
+                context = multiprocessing.get_context('fork')
+                self._pool = context.Pool(self.workers,
+                                          initializer=_warm_worker)
+        return self
+
+    def map(self, texts):
+        ''' Returns the entities and score of every text, in order.
+        '''
+        if self.workers <= 0 or len(texts) < self.min_parallel:
+            return analyze_texts(texts)
+        self.start()
+        size = -(-len(texts) // (self.workers * CHUNKS_PER_WORKER))
+        chunks = [texts[i:i + size] for i in range(0, len(texts), size)]
+        return [result for chunk in self._pool.map(analyze_texts, chunks)
+                for result in chunk]
+
+    def close(self):
+        ''' Stops the worker processes.
+        '''
+        with self._lock:
+            if self._pool is not None:
+                self._pool.terminate()
+                self._pool = None
@@ -0,0 +1,251 @@
+''' This module fetches the timelines of many users concurrently through one
+tweepy api, while keeping within Twitter's per window rate limit.
+
+Nothing here ever sleeps until a window resets: once the budget is spent,
+fetches fail fast with RateLimitExceeded, or serve the stored timeline.
+'''
+from concurrent.futures import Future, ThreadPoolExecutor
+import os
+import threading
+import time
+
+from requests.adapters import HTTPAdapter
+import tweepy
+
+from .metrics import METRICS
+from .retrieval import DEFAULT_COUNT, MAX_HISTORY, TweetStore, \
+    get_timeline_history, get_tweets_from_user
+
+
+DEFAULT_FETCH_WORKERS = int(os.environ.get('FETCH_WORKERS', 16))
+# statuses/user_timeline allows 900 calls per 15 minute window with user auth
+RATE_LIMIT_WINDOW = 15 * 60
+TIMELINE_WINDOW_LIMIT = int(os.environ.get('TIMELINE_WINDOW_LIMIT', 900))
+SERVE_STALE = os.environ.get('SERVE_STALE_TIMELINES', 'true').lower() == 'true'
+# what tweepy raises on a 429, by version: 4.x, then 3.x
+TWITTER_RATE_LIMIT_ERRORS = tuple(
+    getattr(tweepy, name) for name in ['TooManyRequests', 'RateLimitError']
+    if hasattr(tweepy, name))
+
+
+class RateLimitExceeded(Exception):
+    ''' Raised instead of calling Twitter once the window's calls are spent.
+    '''
+    def __init__(self, reset_in):
+        super(RateLimitExceeded, self).__init__(
+            'rate limit reached, resets in {:.0f} seconds'.format(reset_in))
+        self.reset_in = reset_in
+
+
+class RateWindow:
+    ''' Counts calls against a limit per fixed window, the way Twitter does.
+    The window starts with the first call made after the previous one ended.
+    '''
+    def __init__(self,
+                 limit=TIMELINE_WINDOW_LIMIT,
+                 window=RATE_LIMIT_WINDOW,
+                 clock=time.monotonic):
+        self.limit = limit
+        self.window = window
+        self._clock = clock
+        self._used = 0
+        self._reset_at = None
+        self._lock = threading.Lock()
+
+    def _roll(self):
+        ''' Starts a new window if the current one is over.
+        '''
+        now = self._clock()
+        if self._reset_at is None or now >= self._reset_at:
+            self._used = 0
+            self._reset_at = now + self.window
+
+    def try_acquire(self):
+        ''' Takes one call from the window, returning False if none are left.
+        '''
+        with self._lock:
+            self._roll()
+            if self._used >= self.limit:
+                return False
+            self._used += 1
+            return True
+
+    def remaining(self):
+        ''' Returns how many calls are left in the current window.
+        '''
+        with self._lock:
+            self._roll()
+            return self.limit - self._used
+
+    def reset_in(self):
+        ''' Returns the seconds until the current window ends.
+        '''
+        with self._lock:
+            self._roll()
+            return self._reset_at - self._clock()
+
+    def sync(self, remaining, reset_in=None):
+        ''' Corrects the window with the budget Twitter reported, remaining
+        calls that reset in reset_in seconds. Twitter's count only ever lowers
+        ours, since calls still in flight are not in it yet.
+        '''
+        with self._lock:
+            self._roll()
+            self._used = max(self._used, self.limit - remaining)
+            if reset_in is not None:
+                self._reset_at = self._clock() + max(reset_in, 0)
+
+
+class SingleFlight:
+    ''' Coalesces concurrent calls with the same key into one: the first
+    caller runs the function and the others wait for and share its result,
+    or its exception.
+    '''
+    def __init__(self):
+        self.coalesced = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args):
+        ''' Returns func(*args), or the result of the call with the same key
+        that is already running.
+        '''
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+        try:
+            result = func(*args)
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class TimelineFetcher:
+    ''' Wraps a tweepy api so user_timeline calls are counted against a
+    RateWindow, and fetches many users at once on a pool of worker threads.
+
+    The window follows the budget Twitter reports with every response.
+    Concurrent fetches of the same user are coalesced into one call, and when
+    the budget is spent a user's stored timeline is served if serve_stale.
+
+    It has the api's user_timeline method, so it can be handed to the
+    retrieval functions in place of the api itself.
+    '''
+    def __init__(self, api, workers=DEFAULT_FETCH_WORKERS, limiter=None,
+                 serve_stale=SERVE_STALE):
+        self.api = api
+        self.workers = workers
+        self.limiter = limiter or RateWindow()
+        self.serve_stale = serve_stale
+        self.stale = 0
+        self._flights = SingleFlight()
+        self._pool = ThreadPoolExecutor(max_workers=workers,
+                                        thread_name_prefix='timeline-fetch')
+        pool_connections(api, workers)
+
+    def user_timeline(self, **kwargs):
+        ''' Calls the api's user_timeline, or raises RateLimitExceeded if the
+        window has no calls left or Twitter answers that it has none.
+        '''
+        if not self.limiter.try_acquire():
+            raise RateLimitExceeded(self.limiter.reset_in())
+        try:
+            with METRICS.stage('twitter'):
+                statuses = self.api.user_timeline(**kwargs)
+        except TWITTER_RATE_LIMIT_ERRORS:
+            self._sync_budget()
+            self.limiter.sync(0)
+            raise RateLimitExceeded(self.limiter.reset_in())
+        self._sync_budget()
+        METRICS.count('twitter', len(statuses))
+        return statuses
+
+    def _sync_budget(self):
+        ''' Updates the window from the rate limit headers of the api's last
+        response, if it keeps one.
+        '''
+        headers = getattr(getattr(self.api, 'last_response', None),
+                          'headers', None) or {}
+        if 'x-rate-limit-remaining' in headers:
+            reset = headers.get('x-rate-limit-reset')
+            self.limiter.sync(
+                int(headers['x-rate-limit-remaining']),
+                int(reset) - time.time() if reset is not None else None)
+
+    def fetch(self, screen_name: str, store: TweetStore = None,
+              count=DEFAULT_COUNT):
+        ''' Returns one user's tweets, see retrieval.get_tweets_from_user.
+        Once the rate limit is spent the stored tweets are returned instead,
+        if there are any and serve_stale is set.
+        '''
+        try:
+            return self._flights.do(
+                ('timeline', screen_name.lower(), count),
+                get_tweets_from_user, screen_name, self, count, store)
+        except RateLimitExceeded:
+            stored = store.get(screen_name) if store is not None else None
+            if not (self.serve_stale and stored):
+                raise
+            self.stale += 1
+            return stored
+
+    def history(self, screen_name: str, max_tweets=MAX_HISTORY):
+        ''' Returns up to max_tweets of a user's tweets, see
+        retrieval.get_timeline_history.
+        '''
+        return self._flights.do(
+            ('history', screen_name.lower(), max_tweets),
+            get_timeline_history, screen_name, self, max_tweets)
+
+    def fetch_many(self, screen_names, store: TweetStore = None,
+                   count=DEFAULT_COUNT):
+        ''' Fetches the tweets of every user concurrently and returns, in
+        order, each user's TweetBatch or the RateLimitExceeded that stopped
+        it from being fetched.
+        '''
+        futures = [self._pool.submit(self.fetch, screen_name, store, count)
+                   for screen_name in screen_names]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except RateLimitExceeded as error:
+                results.append(error)
+        return results
+
+    def stats(self):
+        ''' Returns the fetcher's settings and rate limit budget as a
+        dictionary to be jsonified.
+        '''
+        return {
+            'workers': self.workers,
+            'limit': self.limiter.limit,
+            'remaining': self.limiter.remaining(),
+            'reset_in': self.limiter.reset_in(),
+            'coalesced': self._flights.coalesced,
+            'stale': self.stale}
+
+
+def pool_connections(api, size: int):
+    ''' Lets api keep up to size keep-alive connections to Twitter open, one
+    per fetch worker, instead of requests' default of 10. This only applies
+    to tweepy versions whose api shares one requests session between calls;
+    older ones open a session per call and are left alone. Plain http is
+    pooled too, for stand-ins of Twitter, see flasks.redirect_api.
+    '''
+    session = getattr(api, 'session', None)
+    if session is not None:
+        for prefix in ['https://', 'http://']:
+            session.mount(prefix, HTTPAdapter(pool_maxsize=size))
@@ -1,9 +1,13 @@
 ''' This module defines an extension of the default Flask.
 '''
 from flask import Flask
+from requests.adapters import BaseAdapter
 import tweepy
 
 
+TWITTER_API_BASE = 'https://api.twitter.com'
+
+
 class FlaskWithTwitterAPI(Flask):
     ''' This class just extends flask.Flask while holding the connection to the
     Twitter API to keep ../app.py a little cleaner.
@@ -13,9 +17,11 @@ class FlaskWithTwitterAPI(Flask):
                  twitter_consumer_key=None,
                  twitter_consumer_secret=None,
                  twitter_access_token=None,
-                 twitter_access_token_secret=None):
+                 twitter_access_token_secret=None,
+                 twitter_api_url=None):
         ''' Initializes an instance of FlaskWithTwitterAPI and makes the connection
-        to Twitter's API with tweepy.
+        to Twitter's API with tweepy, or to a stand-in for it at
+        twitter_api_url.
         '''
         super(FlaskWithTwitterAPI, self).__init__(import_name)
 
@@ -30,9 +36,40 @@ class FlaskWithTwitterAPI(Flask):
         _auth.set_access_token(
             twitter_access_token,
             twitter_access_token_secret)
-        self.api = tweepy.API(_auth, wait_on_rate_limit=True)
+        # tools.fetching.TimelineFetcher keeps within the rate limit, failing
+        # fast instead of sleeping in a request thread until the window resets
+        self.api = tweepy.API(_auth, wait_on_rate_limit=False)
+        if twitter_api_url:
+            redirect_api(self.api, twitter_api_url)
 
     def check_api_status(self):
         ''' This method checks the status of the connection to Twitter's API.
         '''
         pass
+
+
+class RedirectAdapter(BaseAdapter):
+    ''' Sends the requests a session makes to source on to target instead,
+    through the session's own adapter for target.
+    '''
+    def __init__(self, session, source, target):
+        super(RedirectAdapter, self).__init__()
+        self.session = session
+        self.source = source
+        self.target = target.rstrip('/')
+
+    def send(self, request, **kwargs):
+        request.url = self.target + request.url[len(self.source):]
+        return self.session.get_adapter(request.url).send(request, **kwargs)
+
+    def close(self):
+        pass
+
+
+def redirect_api(api, url):
+    ''' Points a tweepy api at url, like a local stand-in for Twitter, instead
+    of TWITTER_API_BASE. This needs a tweepy version whose api shares one
+    requests session between calls.
+    '''
+    api.session.mount(TWITTER_API_BASE,
+                      RedirectAdapter(api.session, TWITTER_API_BASE, url))
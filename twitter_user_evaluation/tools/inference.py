@@ -0,0 +1,116 @@
+''' This module provides a micro-batching front end for model inference, so
+concurrent requests share predict calls instead of each running their own.
+'''
+from concurrent.futures import Future
+import os
+import queue
+import threading
+import time
+
+from .metrics import METRICS
+
+
+DEFAULT_BATCH_WINDOW = float(
+    os.environ.get('INFERENCE_BATCH_WINDOW_MS', 5)) / 1000
+DEFAULT_MAX_BATCH_SIZE = int(os.environ.get('INFERENCE_MAX_BATCH_SIZE', 4096))
+
+
+class BatchingPredictor:
+    ''' Queues the sequences of concurrent callers and runs them through
+    predict together on a single worker thread.
+
+    The worker waits up to window seconds after the first queued request for
+    more to arrive, or until max_batch_size sequences are queued, then calls
+    predict once and hands every caller its own rows. Since only the worker
+    ever calls predict, the model never has to be thread safe. Every predict
+    call is timed, with its batch size, as stage in metrics.METRICS.
+    '''
+    def __init__(self,
+                 predict,
+                 window=DEFAULT_BATCH_WINDOW,
+                 max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                 stage='predict'):
+        ''' Initializes the predictor around predict, a function taking a list
+        of sequences and returning one row of predictions per sequence.
+        '''
+        self._predict = predict
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.stage = stage
+        self.batches = 0
+        self.requests = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def predict(self, sequences):
+        ''' Returns the predictions for sequences, blocking until the batch
+        they were put in has been run. Errors raised by predict are raised
+        here in every caller of the failed batch.
+        '''
+        if not sequences:
+            return self._predict(sequences)
+        self._start()
+        future = Future()
+        self._queue.put((sequences, future))
+        return future.result()
+
+    def _start(self):
+        ''' Starts the worker thread the first time it is needed.
+        '''
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name='batching-predictor', daemon=True)
+                self._worker.start()
+
+    def _collect(self):
+        ''' Blocks for the first request, then gathers more until the window
+        closes or the batch is full.
+        '''
+        batch = [self._queue.get()]
+        size = len(batch[0][0])
+        deadline = time.monotonic() + self.window
+        while size < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+            size += len(batch[-1][0])
+        return batch
+
+    def _run(self):
+        ''' Worker loop: collect a batch, predict it, split the predictions.
+        '''
+        while True:
+            batch = self._collect()
+            self.batches += 1
+            self.requests += len(batch)
+            merged = [sequence for sequences, _ in batch
+                      for sequence in sequences]
+            METRICS.observe('batch_size', len(merged), stage=self.stage)
+            METRICS.count(self.stage, len(merged))
+            try:
+                with METRICS.stage(self.stage):
+                    preds = self._predict(merged)
+            except Exception as error:
+                for _, future in batch:
+                    future.set_exception(error)
+                continue
+            offset = 0
+            for sequences, future in batch:
+                future.set_result(preds[offset:offset + len(sequences)])
+                offset += len(sequences)
+
+    def stats(self):
+        ''' Returns the batching counters as a dictionary to be jsonified.
+        '''
+        return {
+            'window': self.window,
+            'max_batch_size': self.max_batch_size,
+            'batches': self.batches,
+            'requests': self.requests,
+            'queued': self._queue.qsize()}
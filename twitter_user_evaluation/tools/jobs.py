@@ -0,0 +1,176 @@
+''' This module runs long analyses in the background, so a deep or multi-user
+analysis does not hold a Flask worker for the whole Twitter fetch and NLP.
+
+Jobs are queued by priority, in a bounded queue, and run by a pool of worker
+threads. Their results are kept for JOB_TTL seconds once they are done, to
+be polled or long-polled for by their id.
+'''
+import itertools
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+
+from .metrics import METRICS
+
+
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 4))
+JOB_QUEUE_SIZE = int(os.environ.get('JOB_QUEUE_SIZE', 100))
+JOB_TTL = float(os.environ.get('JOB_TTL', 10 * 60))
+# lower runs first, jobs of the same priority run in the order they came
+JOB_PRIORITIES = {'high': 0, 'normal': 1, 'low': 2}
+DEFAULT_PRIORITY = 'normal'
+UNEXPECTED_FAILURE = 'Job failed unexpectedly.'
+
+
+class JobFailed(Exception):
+    ''' Raised by a job to fail with its message as the error polled for.
+    '''
+
+
+class QueueFull(Exception):
+    ''' Raised instead of queueing a job when JOB_QUEUE_SIZE jobs are waiting.
+    '''
+
+
+class Job:
+    ''' A function queued to run in the background, with its status: queued,
+    running, done with a result or failed with an error.
+    '''
+    def __init__(self, func, priority=DEFAULT_PRIORITY, clock=time.monotonic):
+        self.id = uuid.uuid4().hex
+        self.func = func
+        self.priority = priority
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.finished_at = None
+        self._clock = clock
+        self._queued_at = clock()
+        self._done = threading.Event()
+
+    def run(self):
+        ''' Runs the job's function, recording its result or error.
+        '''
+        self.status = 'running'
+        METRICS.observe('stage_seconds', self._clock() - self._queued_at,
+                        stage='job_queue')
+        try:
+            with METRICS.stage('job'):
+                self.result = self.func()
+            self.status = 'done'
+        except JobFailed as error:
+            self.error = str(error)
+            self.status = 'failed'
+        except Exception:
+            logging.exception('job %s failed', self.id)
+            self.error = UNEXPECTED_FAILURE
+            self.status = 'failed'
+        self.func = None
+        self.finished_at = self._clock()
+        self._done.set()
+
+    def wait(self, timeout=None):
+        ''' Blocks until the job is finished, or for timeout seconds, and
+        returns whether it is finished.
+        '''
+        return self._done.wait(timeout)
+
+    def report(self):
+        ''' Returns the job's status as a dictionary ready to be jsonified,
+        with its result or error once it has one.
+        '''
+        report = {'id': self.id, 'status': self.status,
+                  'priority': self.priority}
+        if self.status == 'done':
+            report['result'] = self.result
+        elif self.status == 'failed':
+            report['error'] = self.error
+        return report
+
+
+class JobQueue:
+    ''' Runs jobs on worker threads, highest priority first, keeping at most
+    max_size of them waiting and the finished ones for ttl seconds.
+    '''
+    def __init__(self,
+                 workers=JOB_WORKERS,
+                 max_size=JOB_QUEUE_SIZE,
+                 ttl=JOB_TTL,
+                 clock=time.monotonic):
+        self.workers = workers
+        self.ttl = ttl
+        self.expired = 0
+        self._clock = clock
+        self._queue = queue.PriorityQueue(max_size)
+        self._order = itertools.count()
+        self._jobs = {}
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def submit(self, func, priority=DEFAULT_PRIORITY):
+        ''' Queues func, a function taking no arguments, returning its Job.
+        Raises QueueFull if too many jobs are waiting already.
+        '''
+        self._start()
+        job = Job(func, priority, self._clock)
+        with self._lock:
+            self._expire()
+            try:
+                self._queue.put_nowait(
+                    (JOB_PRIORITIES[priority], next(self._order), job))
+            except queue.Full:
+                raise QueueFull
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id):
+        ''' Returns the job with job_id, or None if there is none or it
+        expired.
+        '''
+        with self._lock:
+            self._expire()
+            return self._jobs.get(job_id)
+
+    def _expire(self):
+        ''' Forgets the jobs that finished more than ttl seconds ago.
+        '''
+        now = self._clock()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None
+                   and now - job.finished_at >= self.ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+        self.expired += len(expired)
+
+    def _start(self):
+        ''' Starts the worker threads the first time they are needed.
+        '''
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(
+                    target=self._run, daemon=True,
+                    name='job-worker-{}'.format(len(self._threads)))
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        ''' Worker loop: run the next job in priority order.
+        '''
+        while True:
+            _, _, job = self._queue.get()
+            job.run()
+
+    def stats(self):
+        ''' Returns how many kept jobs are in each status, and how many
+        expired, as a dictionary to be jsonified.
+        '''
+        with self._lock:
+            self._expire()
+            stats = dict.fromkeys(['queued', 'running', 'done', 'failed'], 0)
+            for job in self._jobs.values():
+                stats[job.status] += 1
+            stats['expired'] = self.expired
+            return stats
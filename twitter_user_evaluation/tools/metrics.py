@@ -0,0 +1,195 @@
+''' This module keeps per stage timers and counters for the app, and renders
+them in Prometheus' text exposition format for GET /metrics.
+
+Every stage of a request, from the Twitter call to the model's predict, is
+timed into one histogram labelled by stage, and counts the tweets or texts it
+processed. Counters owned by other objects, like cache hits, are read when
+the metrics are rendered through registered collectors. A thread can also
+trace the stages it runs, for profiling a single request.
+'''
+import bisect
+import collections
+import contextlib
+import functools
+import math
+import threading
+import time
+
+
+METRIC_PREFIX = 'twitter_user_evaluation_'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (1, 10, 50, 100, 200, 500, 1000, 3200, 10000)
+# the type, help and, for histograms, the buckets of what Metrics records
+METRIC_TYPES = {
+    'stage_seconds': ('histogram', 'Seconds spent in each stage.',
+                      SECONDS_BUCKETS),
+    'stage_items_total': ('counter',
+                          'Tweets or texts processed by each stage.', None),
+    'batch_size': ('histogram', 'Items per call of the batched stages.',
+                   SIZE_BUCKETS),
+}
+
+
+class Metrics:
+    ''' Thread safe registry of counters and histograms keyed by name and
+    labels, with the names and types of METRIC_TYPES.
+
+    Collectors are functions returning (name, type, help, labels, value)
+    samples, called on every render for values kept elsewhere.
+    '''
+    def __init__(self, types=None, prefix=METRIC_PREFIX):
+        self.types = dict(METRIC_TYPES if types is None else types)
+        self.prefix = prefix
+        self._series = collections.defaultdict(dict)
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def inc(self, name: str, value=1, **labels):
+        ''' Adds value to the counter name with labels.
+        '''
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series[name]
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value, **labels):
+        ''' Records value in the histogram name with labels.
+        '''
+        buckets = self.types[name][2]
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series[name]
+            if key not in series:
+                series[key] = {'counts': [0] * (len(buckets) + 1), 'sum': 0}
+            histogram = series[key]
+            histogram['counts'][bisect.bisect_left(buckets, value)] += 1
+            histogram['sum'] += value
+
+    @contextlib.contextmanager
+    def stage(self, stage: str):
+        ''' Times the body of a with statement as stage, whether it returns or
+        raises.
+        '''
+        trace = getattr(self._local, 'trace', None)
+        start = time.perf_counter()
+        if trace is not None:
+            entry = {'stage': stage, 'start': start,
+                     'depth': self._local.depth}
+            trace.append(entry)
+            self._local.depth += 1
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe('stage_seconds', elapsed, stage=stage)
+            if trace is not None:
+                entry['seconds'] = elapsed
+                self._local.depth -= 1
+
+    @contextlib.contextmanager
+    def trace(self):
+        ''' Records the stages this thread runs in the body of a with
+        statement into the list it yields, in the order they started, as
+        dictionaries of their stage, start and seconds, and depth of nesting.
+        Starts are in seconds since the body began.
+        '''
+        trace = self._local.trace = []
+        self._local.depth = 0
+        origin = time.perf_counter()
+        try:
+            yield trace
+        finally:
+            del self._local.trace
+            for entry in trace:
+                entry['start'] -= origin
+
+    def count(self, stage: str, items: int):
+        ''' Counts items, tweets or texts, as processed by stage.
+        '''
+        self.inc('stage_items_total', items, stage=stage)
+
+    def register(self, collector):
+        ''' Adds a collector, returning it so this can be used as a decorator.
+        '''
+        self._collectors.append(collector)
+        return collector
+
+    def samples(self):
+        ''' Returns every metric as a dictionary from its name to its type,
+        help and a list of (suffix, labels, value) samples.
+        '''
+        metrics = collections.OrderedDict()
+        with self._lock:
+            for name in sorted(self._series):
+                kind, help_text, buckets = self.types[name]
+                samples = []
+                for key, value in sorted(self._series[name].items()):
+                    labels = dict(key)
+                    if kind != 'histogram':
+                        samples.append(('', labels, value))
+                        continue
+                    total = 0
+                    for bound, count in zip(buckets + (math.inf,),
+                                            value['counts']):
+                        total += count
+                        samples.append(('_bucket', dict(labels, le=bound),
+                                        total))
+                    samples.append(('_sum', labels, value['sum']))
+                    samples.append(('_count', labels, total))
+                metrics[name] = (kind, help_text, samples)
+        for collector in self._collectors:
+            for name, kind, help_text, labels, value in collector():
+                metrics.setdefault(name, (kind, help_text, []))[2].append(
+                    ('', labels, value))
+        return metrics
+
+    def render(self):
+        ''' Returns every metric in the Prometheus text exposition format.
+        '''
+        lines = []
+        for name, (kind, help_text, samples) in self.samples().items():
+            name = self.prefix + name
+            lines.append('# HELP {} {}'.format(name, help_text))
+            lines.append('# TYPE {} {}'.format(name, kind))
+            for suffix, labels, value in samples:
+                lines.append('{}{}{} {}'.format(
+                    name, suffix, format_labels(labels), format_value(value)))
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels):
+    ''' Formats labels as Prometheus does, escaping their values.
+    '''
+    if not labels:
+        return ''
+    return '{' + ','.join(
+        '{}="{}"'.format(name, format_value(value).replace('\\', r'\\')
+                         .replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in sorted(labels.items())) + '}'
+
+
+def format_value(value):
+    ''' Formats a sample or label value, with Prometheus' names for infinity.
+    '''
+    if isinstance(value, float) and math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return str(value)
+
+
+# the metrics of this process, rendered by GET /metrics
+METRICS = Metrics()
+
+
+def timed(stage: str):
+    ''' Decorator that times every call of a function as stage in METRICS.
+    '''
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with METRICS.stage(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
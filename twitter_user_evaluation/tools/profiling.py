@@ -0,0 +1,125 @@
+''' This module runs single requests under cProfile, for diagnosing why one
+user's analysis is slow in production without redeploying.
+
+A profile holds the stages of metrics.METRICS the request went through, with
+when each started and how long it took, and the functions that took the most
+time of their own. Profiling is only ever done for internal callers: those
+sending PROFILE_TOKEN when it is set, or else those calling from a loopback
+or private address.
+'''
+import collections
+import cProfile
+import ipaddress
+import itertools
+import os
+import pstats
+import threading
+import time
+
+from .metrics import METRICS
+
+
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN')
+PROFILE_TOP_FUNCTIONS = int(os.environ.get('PROFILE_TOP_FUNCTIONS', 20))
+PROFILE_HISTORY = int(os.environ.get('PROFILE_HISTORY', 50))
+
+
+def is_internal(remote_addr, token=None):
+    ''' Returns whether a caller may profile its requests: with PROFILE_TOKEN
+    set, whether it sent the token, otherwise whether its address is
+    loopback or private.
+    '''
+    if PROFILE_TOKEN:
+        return token == PROFILE_TOKEN
+    try:
+        address = ipaddress.ip_address(remote_addr or '')
+    except ValueError:
+        return False
+    return address.is_loopback or address.is_private
+
+
+class RequestProfile:
+    ''' Profiles the body of a with statement on the current thread, tracing
+    its METRICS stages. report then returns both as a dictionary ready to be
+    jsonified.
+    '''
+    # cProfile cannot run twice at once on some Python versions
+    _lock = threading.Lock()
+
+    def __init__(self, top=PROFILE_TOP_FUNCTIONS):
+        self.top = top
+        self.stages = []
+        self.seconds = None
+        self._profiler = cProfile.Profile()
+        self._trace = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        self._trace = METRICS.trace()
+        self.stages = self._trace.__enter__()
+        self._start = time.perf_counter()
+        self._profiler.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._profiler.disable()
+        self.seconds = time.perf_counter() - self._start
+        self._trace.__exit__(*exc_info)
+        self._lock.release()
+
+    def hot_functions(self):
+        ''' Returns the top functions by the time spent in their own code,
+        with how often they were called and their cumulative time.
+        '''
+        stats = pstats.Stats(self._profiler).stats
+        hottest = sorted(stats.items(), key=lambda item: -item[1][2])
+        return [{
+            'function': function_name(function),
+            'calls': calls,
+            'own_seconds': own,
+            'cumulative_seconds': cumulative,
+            } for function, (_, calls, own, cumulative, _) in
+            hottest[:self.top]]
+
+    def report(self):
+        ''' Returns the profile as a dictionary ready to be jsonified.
+        '''
+        return {
+            'seconds': self.seconds,
+            'stages': self.stages,
+            'hot_functions': self.hot_functions()}
+
+
+def function_name(function):
+    ''' Names a pstats function by the last parts of its file, its line and
+    its name.
+    '''
+    path, line, name = function
+    if path == '~':
+        return name
+    return '{}:{}({})'.format(
+        os.path.join(*path.split(os.sep)[-2:]), line, name)
+
+
+class ProfileStore:
+    ''' Keeps the last max_size profiles so they can be fetched after the
+    response they came with.
+    '''
+    def __init__(self, max_size=PROFILE_HISTORY):
+        self._profiles = collections.deque(maxlen=max_size)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add(self, profile):
+        ''' Stores a profile report, returning the id it was given.
+        '''
+        with self._lock:
+            profile = dict(profile, id=next(self._ids))
+            self._profiles.append(profile)
+            return profile['id']
+
+    def all(self):
+        ''' Returns the stored profiles, newest first.
+        '''
+        with self._lock:
+            return list(reversed(self._profiles))
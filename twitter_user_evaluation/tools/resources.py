@@ -0,0 +1,200 @@
+''' This module loads the models and nltk data the analytics need. Nothing is
+loaded at import time: every resource is loaded the first time it is used or
+by a warm up thread started when the app starts, so the app can accept
+traffic while the heavy models are still loading.
+
+The nltk data is read from a local directory and never downloaded at run
+time. Populate it when building the app, e.g.:
+    python -m nltk.downloader -d twitter_user_evaluation/tools/nltk_data \
+        vader_lexicon averaged_perceptron_tagger maxent_ne_chunker words punkt
+'''
+import os
+import pickle
+import threading
+
+
+MAX_SEQUENCE_LENGTH = 1000
+NLTK_DATA_DIR = os.path.join('twitter_user_evaluation', 'tools', 'nltk_data')
+NE_CHUNKER_PATH = 'chunkers/maxent_ne_chunker/english_ace_multiclass.pickle'
+POL_MODEL_DIR = os.path.join('twitter_user_evaluation', 'tools', 'models')
+POL_MODEL_TKNZR_PATH = os.environ.get(
+    'POL_MODEL_TKNZR_PATH', os.path.join(POL_MODEL_DIR, 'cdo_tknzr.pickle'))
+POL_MODEL_PATH = os.environ.get(
+    'POL_MODEL_PATH', os.path.join(POL_MODEL_DIR, 'conv_dropout_model.h5'))
+NB_PIPELINE_PATH = os.path.join(
+    POL_MODEL_DIR, 'MultinomialNB_pipeline.pickle')
+SVM_PIPELINE_PATH = os.path.join(
+    POL_MODEL_DIR, 'linear_svm_pipeline.pickle')
+RESOURCE_NAMES = [
+    'word_tokenizer',
+    'pos_tagger',
+    'ne_chunker',
+    'sentiment_model',
+    'pol_model_tknzr',
+    'pol_model',
+]
+
+
+class ResourceManager:
+    ''' Holds the models used by the analytics and loads each of them once,
+    on first use, in a thread safe way.
+    '''
+    def __init__(self,
+                 nltk_data_dir=NLTK_DATA_DIR,
+                 pol_model_tknzr_path=POL_MODEL_TKNZR_PATH,
+                 pol_model_path=POL_MODEL_PATH,
+                 nb_pipeline_path=NB_PIPELINE_PATH,
+                 svm_pipeline_path=SVM_PIPELINE_PATH):
+        self.nltk_data_dir = nltk_data_dir
+        self.pol_model_tknzr_path = pol_model_tknzr_path
+        self.pol_model_path = pol_model_path
+        self.nb_pipeline_path = nb_pipeline_path
+        self.svm_pipeline_path = svm_pipeline_path
+        self.error = None
+        self._resources = {}
+        self._lock = threading.RLock()
+        self._warm_up_thread = None
+
+    def _get(self, name, loader):
+        ''' Returns the resource called name, calling loader to load it if it
+        has not been loaded yet.
+        '''
+        try:
+            return self._resources[name]
+        except KeyError:
+            pass
+        with self._lock:
+            if name not in self._resources:
+                self._resources[name] = loader()
+            return self._resources[name]
+
+    def after_fork(self):
+        ''' Replaces the lock in a forked child process, where it may have
+        been copied while another thread of the parent held it.
+        '''
+        self._lock = threading.RLock()
+        self._warm_up_thread = None
+
+    def _use_local_nltk_data(self):
+        ''' Points nltk at the bundled data directory, ahead of the defaults.
+        '''
+        import nltk
+        data_dir = os.path.abspath(self.nltk_data_dir)
+        if data_dir not in nltk.data.path:
+            nltk.data.path.insert(0, data_dir)
+        return nltk
+
+    @property
+    def sentiment_model(self):
+        ''' nltk's VADER SentimentIntensityAnalyzer.
+        '''
+        def load():
+            self._use_local_nltk_data()
+            from nltk.sentiment.vader import SentimentIntensityAnalyzer
+            return SentimentIntensityAnalyzer()
+        return self._get('sentiment_model', load)
+
+    @property
+    def pos_tagger(self):
+        ''' nltk's averaged perceptron tagger, the one nltk.pos_tag uses.
+        '''
+        def load():
+            self._use_local_nltk_data()
+            from nltk.tag.perceptron import PerceptronTagger
+            return PerceptronTagger()
+        return self._get('pos_tagger', load)
+
+    @property
+    def ne_chunker(self):
+        ''' nltk's maxent named entity chunker, the one nltk.ne_chunk uses.
+        '''
+        def load():
+            return self._use_local_nltk_data().data.load(NE_CHUNKER_PATH)
+        return self._get('ne_chunker', load)
+
+    @property
+    def word_tokenizer(self):
+        ''' nltk's word_tokenize, returned once punkt can be found locally.
+        '''
+        def load():
+            nltk = self._use_local_nltk_data()
+            nltk.word_tokenize('warm up')
+            return nltk.word_tokenize
+        return self._get('word_tokenizer', load)
+
+    @property
+    def pol_model_tknzr(self):
+        ''' The keras Tokenizer fitted for the political sentiment model.
+        '''
+        return self._get('pol_model_tknzr', lambda: self._unpickle(
+            self.pol_model_tknzr_path))
+
+    @property
+    def pol_model(self):
+        ''' The keras political sentiment model, warmed up with one predict.
+        '''
+        def load():
+            from keras.models import load_model
+            import numpy as np
+            model = load_model(self.pol_model_path)
+            model.predict(np.zeros((1, model.input_shape[1]
+                                    or MAX_SEQUENCE_LENGTH)))
+            return model
+        return self._get('pol_model', load)
+
+    @property
+    def nb_pipeline(self):
+        ''' The pickled CountVectorizer, TF-IDF and MultinomialNB pipeline.
+        '''
+        return self._get('nb_pipeline', lambda: self._unpickle(
+            self.nb_pipeline_path))
+
+    @property
+    def svm_pipeline(self):
+        ''' The pickled CountVectorizer, TF-IDF and linear SVM pipeline.
+        '''
+        return self._get('svm_pipeline', lambda: self._unpickle(
+            self.svm_pipeline_path))
+
+    @staticmethod
+    def _unpickle(path):
+        ''' Loads the pickled object at path.
+        '''
+        with open(path, 'rb') as handle:
+            return pickle.load(handle)
+
+    def load_all(self):
+        ''' Loads every resource, recording the first failure in error.
+        '''
+        try:
+            for name in RESOURCE_NAMES:
+                getattr(self, name)
+        except Exception as error:
+            self.error = error
+
+    def warm_up(self):
+        ''' Starts loading every resource in a background thread.
+        '''
+        with self._lock:
+            if self._warm_up_thread is None:
+                self._warm_up_thread = threading.Thread(
+                    target=self.load_all, name='warm-up', daemon=True)
+                self._warm_up_thread.start()
+        return self._warm_up_thread
+
+    @property
+    def ready(self):
+        ''' Whether every resource has been loaded.
+        '''
+        return all(name in self._resources for name in RESOURCE_NAMES)
+
+    def status(self):
+        ''' Returns the loading state as a dictionary ready to be jsonified.
+        '''
+        return {
+            'ready': self.ready,
+            'loaded': sorted(self._resources),
+            'error': None if self.error is None else repr(self.error)}
+
+
+RESOURCES = ResourceManager()
@@ -11,16 +11,26 @@ with open(os.path.join(os.getcwd(),
 
 '''
 import calendar
+import collections
 import re
+import threading
 import typing
 
-from nltk.tokenize import TweetTokenizer
+import numpy as np
 
+from .metrics import METRICS, timed
 
-TKNZR = TweetTokenizer(strip_handles=True)
-HANDLE_REGEX = r'/(^|\b)#\S*($|\b)/'
-HASHTAG_REGEX = r'/(^|\b)@\S*($|\b)/'
-URL_REGEX = r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+'
+
+# the lookbehinds keep email addresses from counting as handles; coming after
+# the literal they only run where there is an @ or # to look at
+HANDLE_REGEX = r'@(?<!\w@)\w+'
+HASHTAG_REGEX = r'#(?<!\w#)\w+'
+URL_REGEX = r'https?://\S+'
+# strips all three in one pass over the text
+CLEAN_REGEX = re.compile('|'.join([URL_REGEX, HANDLE_REGEX, HASHTAG_REGEX]))
+DEFAULT_COUNT = 200
+MAX_HISTORY = 3200
+DEFAULT_STORE_USERS = 1024
 
 
 class Tweet(typing.NamedTuple):
@@ -37,30 +47,326 @@ class Tweet(typing.NamedTuple):
     favorites: int
 
 
-def get_tweets_from_user(screen_name: str, api, count=200):
+class TweetBatch:
+    ''' Struct of arrays holding many tweets, what Tweet holds for one.
+
+    Ids, times, retweets and favorites are int64 arrays and the screen names
+    and texts object arrays, one row per tweet. The hashtags and user mentions
+    of every tweet are flattened into one array each, the ones of row i being
+    hashtags[hashtag_offsets[i]:hashtag_offsets[i + 1]].
+
+    Batches are read only, so they can be shared between the store and any
+    number of requests. Iterating or indexing one gives Tweets, so code
+    written for lists of tweets keeps working with them.
+    '''
+    COLUMNS = ('ids', 'screen_names', 'times', 'raw_texts', 'cleaned_texts',
+               'retweets', 'favorites')
+
+    def __init__(self, ids=(), screen_names=(), times=(), raw_texts=(),
+                 cleaned_texts=(), retweets=(), favorites=(), hashtags=(),
+                 hashtag_offsets=(0,), mentions=(), mention_offsets=(0,)):
+        self.ids = _column(ids, np.int64)
+        self.screen_names = _column(screen_names, object)
+        self.times = _column(times, np.int64)
+        self.raw_texts = _column(raw_texts, object)
+        self.cleaned_texts = _column(cleaned_texts, object)
+        self.retweets = _column(retweets, np.int64)
+        self.favorites = _column(favorites, np.int64)
+        self.hashtags = _column(hashtags, object)
+        self.hashtag_offsets = _column(hashtag_offsets, np.int64)
+        self.mentions = _column(mentions, object)
+        self.mention_offsets = _column(mention_offsets, np.int64)
+
+    @classmethod
+    def from_statuses(cls, statuses):
+        ''' Builds a batch from tweepy statuses, cleaning them like
+        clean_tweet without making a Tweet of each.
+        '''
+        with METRICS.stage('clean'):
+            batch = cls._from_statuses(statuses)
+        METRICS.count('clean', len(batch))
+        return batch
+
+    @classmethod
+    def _from_statuses(cls, statuses):
+        hashtags = [[hashtag['text'].lower()
+                     for hashtag in status.entities['hashtags']]
+                    for status in statuses]
+        mentions = [[user['screen_name']
+                     for user in status.entities['user_mentions']]
+                    for status in statuses]
+        return cls(
+            ids=[status.id for status in statuses],
+            screen_names=[status.user.screen_name for status in statuses],
+            times=[calendar.timegm(status.created_at.utctimetuple())
+                   for status in statuses],
+            raw_texts=[status.text for status in statuses],
+            cleaned_texts=list(clean_texts(
+                status.text for status in statuses)),
+            retweets=[status.retweet_count for status in statuses],
+            favorites=[status.favorite_count for status in statuses],
+            hashtags=[hashtag for tags in hashtags for hashtag in tags],
+            hashtag_offsets=_offsets(hashtags),
+            mentions=[user for users in mentions for user in users],
+            mention_offsets=_offsets(mentions))
+
+    @classmethod
+    def from_tweets(cls, tweets: typing.List[Tweet]):
+        ''' Builds a batch from a list of Tweets, like the pickled ones.
+        '''
+        hashtags = [tweet.hashtag_mentions for tweet in tweets]
+        mentions = [tweet.user_mentions for tweet in tweets]
+        return cls(
+            ids=[int(tweet.tweet_id) for tweet in tweets],
+            screen_names=[tweet.screen_name for tweet in tweets],
+            times=[tweet.time for tweet in tweets],
+            raw_texts=[tweet.raw_text for tweet in tweets],
+            cleaned_texts=[tweet.cleaned_text for tweet in tweets],
+            retweets=[tweet.retweets for tweet in tweets],
+            favorites=[tweet.favorites for tweet in tweets],
+            hashtags=[hashtag for tags in hashtags for hashtag in tags],
+            hashtag_offsets=_offsets(hashtags),
+            mentions=[user for users in mentions for user in users],
+            mention_offsets=_offsets(mentions))
+
+    @classmethod
+    def concat(cls, batches):
+        ''' Joins batches end to end into one.
+        '''
+        batches = [as_batch(batch) for batch in batches]
+        if not batches:
+            return cls()
+        columns = {name: np.concatenate([getattr(batch, name)
+                                         for batch in batches])
+                   for name in cls.COLUMNS + ('hashtags', 'mentions')}
+        for name, flat in [('hashtag_offsets', 'hashtags'),
+                           ('mention_offsets', 'mentions')]:
+            starts = np.cumsum([0] + [len(getattr(batch, flat))
+                                      for batch in batches[:-1]])
+            columns[name] = np.concatenate([[0]] + [
+                getattr(batch, name)[1:] + start
+                for batch, start in zip(batches, starts)])
+        return cls(**columns)
+
+    def take(self, indices):
+        ''' Returns a new batch of the rows at indices, in that order.
+        '''
+        indices = np.asarray(indices, dtype=np.int64)
+        columns = {name: getattr(self, name)[indices]
+                   for name in self.COLUMNS}
+        for name, flat in [('hashtag_offsets', 'hashtags'),
+                           ('mention_offsets', 'mentions')]:
+            offsets = getattr(self, name)
+            starts = offsets[indices]
+            lengths = offsets[indices + 1] - starts
+            new_offsets = np.concatenate([[0], np.cumsum(lengths)])
+            flat_indices = np.arange(new_offsets[-1]) + np.repeat(
+                starts - new_offsets[:-1], lengths)
+            columns[flat] = getattr(self, flat)[flat_indices]
+            columns[name] = new_offsets
+        return type(self)(**columns)
+
+    def owners(self, offsets):
+        ''' Returns the row of every entry of a flattened column, given its
+        offsets, e.g. batch.owners(batch.hashtag_offsets).
+        '''
+        return np.repeat(np.arange(len(self)), np.diff(offsets))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.take(np.arange(len(self))[index])
+        start, end = self.hashtag_offsets[index:index + 2]
+        mention_start, mention_end = self.mention_offsets[index:index + 2]
+        return Tweet(
+            tweet_id=str(self.ids[index]),
+            screen_name=self.screen_names[index],
+            time=int(self.times[index]),
+            raw_text=self.raw_texts[index],
+            cleaned_text=self.cleaned_texts[index],
+            hashtag_mentions=self.hashtags[start:end].tolist(),
+            user_mentions=self.mentions[mention_start:mention_end].tolist(),
+            retweets=int(self.retweets[index]),
+            favorites=int(self.favorites[index]))
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+def _column(values, dtype):
+    ''' Returns values as a read only array of dtype.
+    '''
+    if dtype is object:
+        column = np.empty(len(values), dtype=object)
+        column[:] = list(values)
+    else:
+        column = np.array(values, dtype=dtype)
+    column.flags.writeable = False
+    return column
+
+
+def _offsets(groups):
+    ''' Returns where each group starts in the flattened groups, and where
+    the last one ends.
+    '''
+    return np.cumsum([0] + [len(group) for group in groups])
+
+
+def as_batch(tweets) -> TweetBatch:
+    ''' Returns tweets as a TweetBatch, converting a list of Tweets.
+    '''
+    if isinstance(tweets, TweetBatch):
+        return tweets
+    return TweetBatch.from_tweets(tweets)
+
+
+class TweetStore:
+    ''' Keeps the already cleaned tweets of the users we have fetched, newest
+    first, so later requests only have to ask Twitter for newer tweets.
+
+    At most max_users timelines are kept; the least recently requested one is
+    dropped first. Timelines are kept as read only TweetBatches, which are
+    handed out without copying.
+    '''
+    def __init__(self, max_users=DEFAULT_STORE_USERS):
+        self.max_users = max_users
+        self._timelines = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, screen_name: str) -> TweetBatch:
+        ''' Returns the stored tweets of a user, newest first.
+        '''
+        with self._lock:
+            return self._timelines.get(screen_name.lower(), TweetBatch())
+
+    def max_id(self, screen_name: str):
+        ''' Returns the id of the newest stored tweet of a user or None.
+        '''
+        with self._lock:
+            timeline = self._timelines.get(screen_name.lower())
+            return int(timeline.ids[0]) if timeline else None
+
+    def merge(self,
+              screen_name: str,
+              tweets: TweetBatch,
+              count=DEFAULT_COUNT) -> TweetBatch:
+        ''' Merges freshly fetched tweets into a user's stored timeline, keeps
+        the newest count of them and returns the result.
+        '''
+        key = screen_name.lower()
+        with self._lock:
+            merged = TweetBatch.concat(
+                [tweets, self._timelines.get(key, TweetBatch())])
+            # np.unique keeps the first, so freshly fetched, copy of an id
+            _, first = np.unique(merged.ids, return_index=True)
+            newest = first[np.argsort(-merged.ids[first], kind='stable')]
+            timeline = merged.take(newest[:count])
+            if timeline:
+                self._timelines[key] = timeline
+                self._timelines.move_to_end(key)
+                while len(self._timelines) > self.max_users:
+                    self._timelines.popitem(last=False)
+            return timeline
+
+    def __len__(self):
+        return len(self._timelines)
+
+
+@timed('get_tweets_from_user')
+def get_tweets_from_user(screen_name: str, api, count=DEFAULT_COUNT,
+                         store: TweetStore = None) -> TweetBatch:
     ''' Receives a screen name to query and a tweepy api object. Uses this
-    information to return tweets from this user.
+    information to return tweets from this user, as a TweetBatch.
+
+    When a store is given only tweets newer than the newest stored one are
+    requested, with since_id, and cleaned before being merged into it.
+    '''
+    if store is None:
+        tweets = api.user_timeline(screen_name=screen_name, count=count)
+        return TweetBatch.from_statuses(tweets)
+
+    since_id = store.max_id(screen_name)
+    if since_id is None:
+        tweets = api.user_timeline(screen_name=screen_name, count=count)
+    else:
+        tweets = api.user_timeline(screen_name=screen_name, count=count,
+                                   since_id=since_id)
+    return store.merge(screen_name, TweetBatch.from_statuses(tweets), count)
+
+
+def iter_timeline_pages(screen_name: str, api, max_tweets=MAX_HISTORY,
+                        page_size=DEFAULT_COUNT):
+    ''' Walks a user's timeline backwards with max_id cursors and yields each
+    page of cleaned tweets as a TweetBatch as it arrives, newest first. Only
+    one page of raw tweepy statuses is held at a time and at most max_tweets
+    are yielded.
     '''
-    tweets = api.user_timeline(screen_name=screen_name, count=count)
-    return [clean_tweet(tweet) for tweet in tweets]
+    max_id = None
+    remaining = max_tweets
+    while remaining > 0:
+        count = min(page_size, remaining)
+        if max_id is None:
+            statuses = api.user_timeline(screen_name=screen_name, count=count)
+        else:
+            statuses = api.user_timeline(screen_name=screen_name, count=count,
+                                         max_id=max_id)
+        if not statuses:
+            return
+        page = TweetBatch.from_statuses(statuses[:remaining])
+        max_id = min(status.id for status in statuses) - 1
+        remaining -= len(page)
+        yield page
+
+
+@timed('get_timeline_history')
+def get_timeline_history(screen_name: str, api,
+                         max_tweets=MAX_HISTORY) -> TweetBatch:
+    ''' Receives a screen name to query and a tweepy api object and returns up
+    to max_tweets of the user's tweets, paging past the 200 tweet limit of a
+    single user_timeline call.
+    '''
+    return TweetBatch.concat(
+        iter_timeline_pages(screen_name, api, max_tweets=max_tweets))
 
 
 def clean_tweet(tweet):
     ''' Takes a tweepy tweet object and returns a dictionary that contains
     the information from the tweet that we actually need.
     '''
-    cleaned_text = re.sub(URL_REGEX, '',
-                          re.sub(HASHTAG_REGEX, '',
-                                 re.sub(HANDLE_REGEX, '', tweet.text)))
     return Tweet(
         tweet_id=tweet.id_str,
         screen_name=tweet.user.screen_name,
         time=calendar.timegm(tweet.created_at.utctimetuple()),
         raw_text=tweet.text,
-        cleaned_text=cleaned_text,
+        cleaned_text=clean_text(tweet.text),
         hashtag_mentions=[
             hashtag['text'].lower() for hashtag in tweet.entities['hashtags']],
         user_mentions=[
             user['screen_name'] for user in tweet.entities['user_mentions']],
         retweets=tweet.retweet_count,
         favorites=tweet.favorite_count)
+
+
+def clean_statuses(statuses):
+    ''' Takes an iterable of tweepy tweet objects and lazily yields the
+    cleaned Tweet of each, like clean_tweet.
+    '''
+    for status in statuses:
+        yield clean_tweet(status)
+
+
+def clean_text(text: str):
+    ''' Takes the text of a tweet and strips its handles, hashtags and urls.
+    '''
+    return CLEAN_REGEX.sub('', text).strip()
+
+
+def clean_texts(texts):
+    ''' Takes an iterable of tweet texts and lazily yields each cleaned like
+    clean_text.
+    '''
+    sub = CLEAN_REGEX.sub
+    for text in texts:
+        yield sub('', text).strip()